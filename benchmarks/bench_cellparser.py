@@ -0,0 +1,69 @@
+"""
+Micro-benchmark of CellParser.split_into_lists.
+
+Compares the single pass splitter against the two pass implementation based on
+split_by_separator and cleanse, over a corpus of cells taken from the sheets in
+tests/input. Both implementations must agree on every cell of the corpus.
+
+Usage: python benchmarks/bench_cellparser.py [--repeat N]
+"""
+
+import argparse
+import csv
+import timeit
+from pathlib import Path
+
+from rpft.parsers.common.cellparser import CellParser
+
+INPUT_DIR = Path(__file__).parent.parent / "tests" / "input"
+
+
+def load_corpus(input_dir=INPUT_DIR):
+    cells = []
+    for path in sorted(input_dir.glob("**/*.csv")):
+        with open(path, mode="r", encoding="utf-8") as f:
+            for row in csv.reader(f):
+                cells += row
+    return cells
+
+
+def split_into_lists_two_pass(parser, string):
+    l1 = parser.split_by_separator(string, CellParser.SEPARATORS[0])
+    if type(l1) is str:
+        output = parser.split_by_separator(string, CellParser.SEPARATORS[1])
+    else:
+        output = [parser.split_by_separator(s, CellParser.SEPARATORS[1]) for s in l1]
+    return parser.cleanse(output)
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argparser.add_argument("--repeat", type=int, default=200)
+    args = argparser.parse_args()
+
+    parser = CellParser()
+    corpus = load_corpus()
+    for cell in corpus:
+        expected = split_into_lists_two_pass(parser, cell)
+        if parser.split_into_lists(cell) != expected:
+            raise AssertionError(f"Splitters disagree on cell {cell!r}")
+
+    def run_two_pass():
+        for cell in corpus:
+            split_into_lists_two_pass(parser, cell)
+
+    def run_single_pass():
+        for cell in corpus:
+            parser.split_into_lists(cell)
+
+    two_pass = min(timeit.repeat(run_two_pass, number=args.repeat, repeat=5))
+    single_pass = min(timeit.repeat(run_single_pass, number=args.repeat, repeat=5))
+    per_cell = 1e6 / (len(corpus) * args.repeat)
+    print(f"cells: {len(corpus)}")
+    print(f"two pass:    {two_pass * per_cell:.3f} us/cell")
+    print(f"single pass: {single_pass * per_cell:.3f} us/cell")
+    print(f"speedup:     {two_pass / single_pass:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
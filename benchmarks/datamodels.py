@@ -0,0 +1,14 @@
+"""Data models for the data sheets of the synthetic workloads (see workloads.py)."""
+
+from typing import List
+
+from rpft.parsers.creation.datarowmodel import DataRowModel
+
+
+class MessageRowModel(DataRowModel):
+    message: str = ""
+    extra: List[str] = []
+
+
+class BlockRowModel(DataRowModel):
+    text: str = ""
@@ -0,0 +1,199 @@
+"""
+Benchmarks of create_flows, convert_to_json and flows_to_sheets on synthetic
+workloads (see workloads.py), reporting run time and peak memory.
+
+Results can be saved as a baseline, and later runs are compared against it: a
+benchmark whose time or peak memory exceeds the baseline by more than the
+threshold is flagged as a regression, and the runner exits with status 1.
+Baselines are only comparable when recorded on the same machine.
+
+Usage: python benchmarks/run.py [--scale SCALE ...] [--save] [--threshold T]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from importlib import metadata
+from pathlib import Path
+
+from rpft.converters import convert_to_json, create_flows, flows_to_sheets
+
+from workloads import DATA_MODELS, SCALES, generate_workload
+
+BASELINE_PATH = Path(__file__).parent / "baseline.json"
+
+
+def setup_create_flows(workload, workdir):
+    return lambda: create_flows(
+        [workload], None, "csv", data_models=DATA_MODELS, uuid_seed="0"
+    )
+
+
+def setup_convert_to_json(workload, workdir):
+    return lambda: convert_to_json(workload, "csv")
+
+
+def setup_flows_to_sheets(workload, workdir):
+    flows_path = workdir / "flows.json"
+    create_flows([workload], flows_path, "csv", data_models=DATA_MODELS, uuid_seed="0")
+    output_dir = workdir / "sheets"
+    output_dir.mkdir()
+    return lambda: flows_to_sheets(flows_path, output_dir)
+
+
+BENCHMARKS = {
+    "create_flows": setup_create_flows,
+    "convert_to_json": setup_convert_to_json,
+    "flows_to_sheets": setup_flows_to_sheets,
+}
+
+
+def measure(func, repeat):
+    """
+    Return the minimum run time (in seconds) over repeat runs, and the peak
+    memory (in bytes) of an additional run with tracemalloc enabled.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"time": min(times), "peak_memory": peak}
+
+
+def run_benchmarks(benchmarks, scales, repeat):
+    results = {}
+    for scale in scales:
+        with tempfile.TemporaryDirectory() as directory:
+            workload = Path(directory) / "workload"
+            generate_workload(workload, **SCALES[scale])
+            for name in benchmarks:
+                workdir = Path(directory) / name
+                workdir.mkdir()
+                func = BENCHMARKS[name](workload, workdir)
+                results[f"{name}[{scale}]"] = measure(func, repeat)
+                print(f"ran {name}[{scale}]", file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+    Return a report line for each benchmark, and the names of the benchmarks
+    that regressed beyond the threshold relative to the baseline.
+    """
+    lines = [
+        f"{'benchmark':<28} {'time (s)':>10} {'change':>8}"
+        f" {'peak memory (MB)':>17} {'change':>8}"
+    ]
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get(name)
+        changes = []
+        regressed = False
+        for metric in ("time", "peak_memory"):
+            if previous and previous[metric]:
+                change = result[metric] / previous[metric] - 1
+                regressed |= change > threshold
+                changes.append(f"{change:+8.1%}")
+            else:
+                changes.append(f"{'n/a':>8}")
+        if regressed:
+            regressions.append(name)
+        lines.append(
+            f"{name:<28} {result['time']:>10.3f} {changes[0]}"
+            f" {result['peak_memory'] / 2**20:>17.2f} {changes[1]}"
+            + ("  REGRESSION" if regressed else "")
+        )
+    return lines, regressions
+
+
+def rpft_version():
+    try:
+        return metadata.version("rpft")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def main():
+    argparser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    argparser.add_argument(
+        "--benchmark",
+        choices=BENCHMARKS,
+        default=list(BENCHMARKS),
+        help="benchmarks to run (default: all)",
+        nargs="+",
+    )
+    argparser.add_argument(
+        "--scale",
+        choices=SCALES,
+        default=["small", "medium"],
+        help="workload scales to run the benchmarks at (default: small medium)",
+        nargs="+",
+    )
+    argparser.add_argument("--repeat", type=int, default=3)
+    argparser.add_argument(
+        "--baseline",
+        type=Path,
+        default=BASELINE_PATH,
+        help=f"path of the baseline file (default: {BASELINE_PATH})",
+    )
+    argparser.add_argument(
+        "--save",
+        action="store_true",
+        help="save the results as the new baseline",
+    )
+    argparser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.2,
+        help="relative increase over the baseline flagged as regression",
+    )
+    args = argparser.parse_args()
+
+    results = run_benchmarks(args.benchmark, args.scale, args.repeat)
+
+    baseline = {}
+    if args.baseline.exists():
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["results"]
+    lines, regressions = compare(results, baseline, args.threshold)
+    print("\n".join(lines))
+
+    if args.save:
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(
+                {
+                    "meta": {
+                        "python": platform.python_version(),
+                        "rpft": rpft_version(),
+                    },
+                    "results": {**baseline, **results},
+                },
+                baseline_file,
+                indent=4,
+            )
+        print(f"baseline saved to {args.baseline}")
+
+    if regressions:
+        print(
+            f"{len(regressions)} regression(s) beyond {args.threshold:.0%}:"
+            f" {', '.join(regressions)}",
+            file=sys.stderr,
+        )
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
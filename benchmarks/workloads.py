@@ -0,0 +1,134 @@
+"""
+Generators of synthetic content indexes for benchmarking.
+
+A workload is a folder of CSV sheets that can be converted with
+`rpft create --format csv --datamodels datamodels`. Its size is controlled by:
+
+- templates: number of flow templates, each instantiated once per data row
+- data_rows: number of rows of the data sheet of each template
+- data_columns: number of extra columns of each data sheet
+- loop_size: number of iterations of the begin_for loop in each template
+- block_depth: depth of the chain of nested insert_as_block templates inserted
+  at the end of each template
+
+The generated sheets only depend on these parameters, so the same workload is
+produced on every run.
+"""
+
+import csv
+from pathlib import Path
+
+DATA_MODELS = "datamodels"
+
+SCALES = {
+    "small": dict(
+        templates=2, data_rows=10, data_columns=2, loop_size=3, block_depth=2
+    ),
+    "medium": dict(
+        templates=5, data_rows=40, data_columns=5, loop_size=5, block_depth=3
+    ),
+    "large": dict(
+        templates=10, data_rows=100, data_columns=10, loop_size=10, block_depth=4
+    ),
+}
+
+
+def generate_workload(
+    directory, templates=1, data_rows=1, data_columns=1, loop_size=0, block_depth=0
+):
+    """
+    Write the sheets of a synthetic workload as CSV files into directory.
+
+    :returns: the number of flows the workload produces.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    content_index = [["type", "sheet_name", "data_sheet", "data_model"]]
+
+    for depth in range(block_depth):
+        content_index.append(["template_definition", f"block_{depth}", "", ""])
+        rows = [
+            ["row_id", "type", "from", "message_text", "data_sheet", "data_row_id"],
+            ["", "send_message", "start", "{{text}}", "", ""],
+        ]
+        if depth + 1 < block_depth:
+            rows.append(
+                [
+                    "",
+                    "insert_as_block",
+                    "",
+                    f"block_{depth + 1}",
+                    "blockdata",
+                    f"b{depth + 1}",
+                ]
+            )
+        write_sheet(directory, f"block_{depth}", rows)
+
+    if block_depth:
+        content_index.append(["data_sheet", "blockdata", "", "BlockRowModel"])
+        write_sheet(
+            directory,
+            "blockdata",
+            [["ID", "text"]]
+            + [[f"b{i}", f"Block at depth {i}"] for i in range(block_depth)],
+        )
+
+    for template in range(templates):
+        content_index.append(
+            ["create_flow", f"template_{template}", f"messages_{template}", ""]
+        )
+        content_index.append(
+            ["data_sheet", f"messages_{template}", "", "MessageRowModel"]
+        )
+        write_sheet(
+            directory,
+            f"template_{template}",
+            template_rows(loop_size, block_depth),
+        )
+        write_sheet(
+            directory,
+            f"messages_{template}",
+            [["ID", "message"] + [f"extra.{i + 1}" for i in range(data_columns)]]
+            + [
+                [f"r{row}", f"Message {row} of template {template}"]
+                + [f"value {row}.{i + 1}" for i in range(data_columns)]
+                for row in range(data_rows)
+            ],
+        )
+
+    write_sheet(directory, "content_index", content_index)
+
+    return templates * data_rows
+
+
+def template_rows(loop_size, block_depth):
+    header = [
+        "row_id",
+        "type",
+        "from",
+        "loop_variable",
+        "message_text",
+        "data_sheet",
+        "data_row_id",
+    ]
+    rows = [header, ["", "send_message", "start", "", "{{message}}", "", ""]]
+
+    if loop_size:
+        iterations = ";".join(str(i + 1) for i in range(loop_size))
+        rows += [
+            ["", "begin_for", "", "i", iterations, "", ""],
+            ["", "send_message", "", "", '{{i}}. {{extra|join(", ")}}', "", ""],
+            ["", "end_for", "", "", "", "", ""],
+        ]
+
+    if block_depth:
+        rows.append(["", "insert_as_block", "", "", "block_0", "blockdata", "b0"])
+
+    rows.append(["", "send_message", "", "", "Done", "", ""])
+
+    return rows
+
+
+def write_sheet(directory, name, rows):
+    with open(directory / f"{name}.csv", "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
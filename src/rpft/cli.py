@@ -1,29 +1,93 @@
 import argparse
+import cProfile
 import json
+import pstats
+import sys
+import tracemalloc
 
 from rpft import converters
-from rpft.logger.logger import initialize_main_logger
+from rpft.logger.logger import (
+    CriticalErrors,
+    TraceRecorder,
+    initialize_main_logger,
+    logging_context_handler,
+)
+from rpft.stats import stats
 
 LOGGER = initialize_main_logger()
 
 
 def main():
     args = create_parser().parse_args()
-    args.func(args)
+    stats.enabled = args.stats or bool(args.stats_json)
+    if args.trace:
+        logging_context_handler.trace_recorder = TraceRecorder()
+    if args.memory_top:
+        tracemalloc.start()
+    profiler = None
+    errors = None
+    try:
+        if args.profile or args.profile_top:
+            profiler = cProfile.Profile()
+            profiler.runcall(args.func, args)
+        else:
+            args.func(args)
+    except CriticalErrors as e:
+        errors = e.errors
+    finally:
+        # Also report if a critical error exits, as failed runs are the ones
+        # most worth investigating.
+        if args.memory_top:
+            print_memory_usage(args.memory_top)
+        if profiler:
+            output_profile(profiler, args.profile, args.profile_top)
+        if args.stats:
+            print(stats.format_table())
+        if args.stats_json:
+            with open(args.stats_json, "w") as export:
+                json.dump(stats.to_dict(), export, indent=4)
+        if args.trace:
+            logging_context_handler.trace_recorder.write(args.trace)
+    if errors:
+        report_errors(errors)
+        sys.exit(1)
+
+
+def report_errors(errors):
+    print(f"{len(errors)} critical error(s) occurred:", file=sys.stderr)
+    for error in errors:
+        print(error, file=sys.stderr)
+
+
+def output_profile(profiler, path, top):
+    if path:
+        profiler.dump_stats(path)
+    if top:
+        pstats.Stats(profiler).sort_stats("tottime").print_stats(top)
+
+
+def print_memory_usage(top):
+    snapshot = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"Peak memory usage: {peak / 2**20:.1f} MiB")
+    print(f"Top {top} allocation sites (of memory still allocated at the end):")
+    for statistic in snapshot.statistics("lineno")[:top]:
+        print(statistic)
 
 
 def create_flows(args):
-    flows = converters.create_flows(
+    converters.create_flows(
         args.input,
-        None,
+        args.output,
         args.format,
         data_models=args.datamodels,
         tags=args.tags,
+        compact_data_sheets=args.compact_data_sheets,
+        uuid_seed=args.uuid_seed,
+        keep_going=args.keep_going,
     )
 
-    with open(args.output, "w") as export:
-        json.dump(flows, export, indent=4)
-
 
 def convert_to_json(args):
     content = converters.convert_to_json(args.input, args.format)
@@ -42,6 +106,48 @@ def create_parser():
     parser = argparse.ArgumentParser(
         description=("create RapidPro flows JSON from spreadsheets"),
     )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="print the time spent in each processing stage, and other statistics",
+    )
+    parser.add_argument(
+        "--stats_json",
+        "--stats-json",
+        help="write the statistics printed by --stats to the given JSON file",
+        metavar="PATH",
+    )
+    parser.add_argument(
+        "--trace",
+        help=(
+            "write the nesting of processing steps (content index rows, sheets,"
+            " flows, rows, ...) over time to PATH, in the trace event format that"
+            " can be opened in Chrome (about:tracing) or Perfetto"
+        ),
+        metavar="PATH",
+    )
+    parser.add_argument(
+        "--profile",
+        help="run the subcommand under cProfile and write the profile to PATH",
+        metavar="PATH",
+    )
+    parser.add_argument(
+        "--profile_top",
+        "--profile-top",
+        help="run the subcommand under cProfile and print the N hottest functions",
+        metavar="N",
+        type=int,
+    )
+    parser.add_argument(
+        "--memory_top",
+        "--memory-top",
+        help=(
+            "trace memory allocations with tracemalloc, and print the peak memory"
+            " usage and the N top allocation sites"
+        ),
+        metavar="N",
+        type=int,
+    )
     sub = parser.add_subparsers(
         help="run {subcommand} --help for further information",
         required=True,
@@ -63,6 +169,11 @@ def _add_create_command(sub):
     )
 
     parser.set_defaults(func=create_flows)
+    parser.add_argument(
+        "--compact_data_sheets",
+        action="store_true",
+        help="store data sheet rows in a compact form to reduce memory usage",
+    )
     parser.add_argument(
         "--datamodels",
         help=(
@@ -79,6 +190,16 @@ def _add_create_command(sub):
         help="input sheet format",
         required=True,
     )
+    parser.add_argument(
+        "--keep_going",
+        "--keep-going",
+        action="store_true",
+        help=(
+            "instead of stopping at the first critical error, skip the flow, data"
+            " sheet, campaign etc. in which it occurred, and report all errors at"
+            " the end"
+        ),
+    )
     parser.add_argument(
         "-o",
         "--output",
@@ -95,6 +216,13 @@ def _add_create_command(sub):
         ),
         nargs="*",
     )
+    parser.add_argument(
+        "--uuid_seed",
+        help=(
+            "generate UUIDs deterministically from the given seed instead of"
+            " randomly, so that the same input produces the same output"
+        ),
+    )
     parser.add_argument(
         "input",
         help=(
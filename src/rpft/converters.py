@@ -1,8 +1,14 @@
 import json
 import os
 import shutil
+from contextlib import nullcontext
 from pathlib import Path
 
+from rpft.logger.logger import (
+    CriticalErrors,
+    ProcessingError,
+    keep_going_mode,
+)
 from rpft.parsers.creation.contentindexparser import ContentIndexParser
 from rpft.parsers.creation.tagmatcher import TagMatcher
 from rpft.parsers.sheets import (
@@ -14,9 +20,20 @@ from rpft.parsers.sheets import (
     XLSXSheetReader,
 )
 from rpft.rapidpro.models.containers import RapidProContainer
-
-
-def create_flows(input_files, output_file, sheet_format, data_models=None, tags=[]):
+from rpft.rapidpro.utils import deterministic_uuids
+from rpft.stats import stats
+
+
+def create_flows(
+    input_files,
+    output_file,
+    sheet_format,
+    data_models=None,
+    tags=[],
+    compact_data_sheets=False,
+    uuid_seed=None,
+    keep_going=False,
+):
     """
     Convert source spreadsheet(s) into RapidPro flows.
 
@@ -25,6 +42,13 @@ def create_flows(input_files, output_file, sheet_format, data_models=None, tags=
     :param sheet_format: format of the spreadsheets
     :param data_models: name of module containing supporting Python data classes
     :param tags: names of tags to be used to filter the source spreadsheets
+    :param compact_data_sheets: store data sheet rows in a compact form to reduce
+        memory usage
+    :param uuid_seed: if provided, UUIDs are generated deterministically from this
+        seed (rather than randomly), so that the same input produces the same output
+    :param keep_going: instead of stopping at the first critical error, skip the
+        flow, data sheet, campaign etc. in which it occurred, output the remaining
+        flows, then raise CriticalErrors if any errors occurred
     :returns: dict representing the RapidPro import/export format.
     """
 
@@ -32,14 +56,35 @@ def create_flows(input_files, output_file, sheet_format, data_models=None, tags=
     for input_file in input_files:
         sub_reader = create_sheet_reader(sheet_format, input_file)
         reader.add_reader(sub_reader)
-    parser = ContentIndexParser(reader, data_models, TagMatcher(tags))
-
-    flows = parser.parse_all().render()
-
-    if output_file:
-        with open(output_file, "w") as export:
+    uuid_context = (
+        nullcontext() if uuid_seed is None else deterministic_uuids(uuid_seed)
+    )
+    errors_context = keep_going_mode() if keep_going else nullcontext([])
+    flows = None
+    with uuid_context, errors_context as errors:
+        try:
+            parser = ContentIndexParser(
+                reader,
+                data_models,
+                TagMatcher(tags),
+                compact_data_sheets=compact_data_sheets,
+            )
+            with stats.timer("parse all"):
+                container = parser.parse_all()
+            with stats.timer("render"):
+                flows = container.render()
+        except ProcessingError:
+            # A critical error outside of any unit that can be skipped, so there
+            # is nothing to output.
+            pass
+
+    if output_file and flows is not None:
+        with open(output_file, "w") as export, stats.timer("write JSON"):
             json.dump(flows, export, indent=4)
 
+    if errors:
+        raise CriticalErrors(errors, flows)
+
     return flows
 
 
@@ -79,16 +124,17 @@ def flows_to_sheets(
 
 
 def create_sheet_reader(sheet_format, input_file):
-    if sheet_format == "csv":
-        sheet_reader = CSVSheetReader(input_file)
-    elif sheet_format == "xlsx":
-        sheet_reader = XLSXSheetReader(input_file)
-    elif sheet_format == "json":
-        sheet_reader = JSONSheetReader(input_file)
-    elif sheet_format == "google_sheets":
-        sheet_reader = GoogleSheetReader(input_file)
-    else:
-        raise Exception(f"Format {sheet_format} currently unsupported.")
+    with stats.timer(f"read sheets ({sheet_format})"):
+        if sheet_format == "csv":
+            sheet_reader = CSVSheetReader(input_file)
+        elif sheet_format == "xlsx":
+            sheet_reader = XLSXSheetReader(input_file)
+        elif sheet_format == "json":
+            sheet_reader = JSONSheetReader(input_file)
+        elif sheet_format == "google_sheets":
+            sheet_reader = GoogleSheetReader(input_file)
+        else:
+            raise Exception(f"Format {sheet_format} currently unsupported.")
 
     return sheet_reader
 
@@ -1,63 +1,202 @@
+import json
 import logging
+import os
+import threading
+import time
 from collections import ChainMap
+from contextlib import contextmanager
 import sys
 
 
 LOGGER_NAME = "main"
 
 
+class TraceRecorder:
+    def __init__(self):
+        """
+        Records the nesting of logging contexts over time as trace events
+        that can be viewed in Chrome's about:tracing or Perfetto.
+        """
+        self.events = []
+        self.start_time = time.perf_counter()
+
+    def _add_event(self, name, phase):
+        self.events.append(
+            {
+                "name": name,
+                "ph": phase,
+                # Timestamps are in microseconds
+                "ts": (time.perf_counter() - self.start_time) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+            }
+        )
+
+    def begin(self, name):
+        self._add_event(name, "B")
+
+    def end(self, name):
+        self._add_event(name, "E")
+
+    def write(self, file_path):
+        with open(file_path, "w") as trace_file:
+            json.dump({"traceEvents": self.events}, trace_file)
+
+
+def format_frame(frame):
+    processing_unit, args = frame
+    return processing_unit.format(*args) if args else processing_unit
+
+
 class LoggingContextHandler:
     def __init__(self):
         self.context_variables = []
+        # Frames are pairs of a processing unit and its format arguments
+        # (see logging_context), and are only formatted when needed.
         self.processing_stack = []
+        # If set, the entering/leaving of contexts is recorded
+        self.trace_recorder = None
 
-    def add(self, processing_unit, **new_context_vars):
-        self.processing_stack.append(processing_unit)
+    def add(self, processing_unit, *args, **new_context_vars):
+        frame = (processing_unit, args)
+        self.processing_stack.append(frame)
         self.context_variables.append(new_context_vars)
+        if self.trace_recorder:
+            self.trace_recorder.begin(format_frame(frame))
 
     def get_processing_stack(self):
-        return self.processing_stack
+        return [format_frame(frame) for frame in self.processing_stack]
 
     def get_context_variables(self):
         # Union of all the dicts
         return dict(ChainMap(*self.context_variables))
 
     def pop(self):
-        self.processing_stack.pop()
+        frame = self.processing_stack.pop()
         self.context_variables.pop()
+        if self.trace_recorder:
+            self.trace_recorder.end(format_frame(frame))
 
 
 logging_context_handler = LoggingContextHandler()
 
 
 class logging_context:
-    def __init__(self, processing_unit, **kwargs):
+    __slots__ = ("processing_unit", "args", "kwargs")
+
+    def __init__(self, processing_unit, *args, **kwargs):
+        """
+        Args:
+            processing_unit: description of the unit being processed. If args are
+                provided, this is a format string (for str.format) which is only
+                formatted with args if a record is logged within the context.
+        """
         self.processing_unit = processing_unit
+        self.args = args
         self.kwargs = kwargs
 
     def __enter__(self):
-        logging_context_handler.add(self.processing_unit, **self.kwargs)
+        logging_context_handler.add(self.processing_unit, *self.args, **self.kwargs)
 
     def __exit__(self, exc_type, exc_value, exc_tb):
         logging_context_handler.pop()
 
 
 class ContextFilter(logging.Filter):
-    def __init__(self):
+    def __init__(self, include_context_variables=True):
+        """
+        Args:
+            include_context_variables: whether to add the context variables to
+                records. Merging them is skipped if they are not used.
+        """
         super(ContextFilter, self).__init__()
+        self.include_context_variables = include_context_variables
 
     def filter(self, record):
         record.processing_stack = " | ".join(
             logging_context_handler.get_processing_stack()
         )
-        record.context_variables = logging_context_handler.get_context_variables()
+        if self.include_context_variables:
+            record.context_variables = logging_context_handler.get_context_variables()
         return True
 
 
+class ProcessingError(Exception):
+    pass
+
+
+class CriticalErrors(Exception):
+    def __init__(self, errors, result=None):
+        """
+        Raised at the end of a run in keep-going mode if critical errors occurred.
+
+        Args:
+            errors: the messages of the critical errors (see keep_going_mode).
+            result: the output of the units of processing that succeeded, if any.
+        """
+        super().__init__(f"{len(errors)} critical error(s) occurred")
+        self.errors = errors
+        self.result = result
+
+
+class error_boundary:
+    """
+    Unit of processing (e.g. a flow) that is skipped if a critical error occurs
+    within it while in keep-going mode (see keep_going_mode).
+    """
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        # The error has already been recorded, so we suppress the exception
+        return exc_type is not None and issubclass(exc_type, ProcessingError)
+
+
+class ErrorCollector(logging.Handler):
+    def __init__(self):
+        """
+        Records critical errors (with the processing stack where they occurred),
+        and raises a ProcessingError to skip the current error_boundary.
+        """
+        super().__init__(logging.CRITICAL)
+        self.errors = []
+
+    def emit(self, record):
+        processing_stack = " | ".join(logging_context_handler.get_processing_stack())
+        self.errors.append(
+            f"{record.levelname}: {processing_stack}: {record.getMessage()}"
+        )
+        raise ProcessingError(record.getMessage())
+
+
+@contextmanager
+def keep_going_mode():
+    """
+    Keep-going mode: within this context, critical errors don't exit (see
+    ShutdownHandler), but are recorded and skip the innermost error_boundary.
+    A critical error outside of any error_boundary raises a ProcessingError.
+
+    Yields the list of recorded errors.
+    """
+    logger = get_logger()
+    collector = ErrorCollector()
+    logger.addHandler(collector)
+    ShutdownHandler.keep_going = True
+    try:
+        yield collector.errors
+    finally:
+        ShutdownHandler.keep_going = False
+        logger.removeHandler(collector)
+
+
 class ShutdownHandler(logging.FileHandler):
+    # In keep-going mode, critical errors are handled by an ErrorCollector
+    keep_going = False
+
     def emit(self, record):
         super().emit(record)
-        if record.levelno >= logging.CRITICAL:
+        if record.levelno >= logging.CRITICAL and not self.keep_going:
             # raise Exception(self.format(record))
             print(f"{self.format(record)}", file=sys.stderr)
             sys.exit(1)
@@ -70,13 +209,14 @@ def get_logger():
 def initialize_main_logger(file_path="errors.log"):
     LOGGER = logging.getLogger(LOGGER_NAME)
     LOGGER.setLevel(logging.INFO)
-    context_filter = ContextFilter()
-    LOGGER.addFilter(context_filter)
     # We're currently not using the context_variables, so don't print them.
     # If needed, add "Context: %(context_variables)s" to the format string below
-    stdout_formatter = logging.Formatter(
-        "%(levelname)s: %(processing_stack)s: %(message)s\n"
+    format_string = "%(levelname)s: %(processing_stack)s: %(message)s\n"
+    context_filter = ContextFilter(
+        include_context_variables="%(context_variables)" in format_string
     )
+    LOGGER.addFilter(context_filter)
+    stdout_formatter = logging.Formatter(format_string)
     stdout_handler = ShutdownHandler(file_path, "w")
     stdout_handler.setFormatter(stdout_formatter)
     LOGGER.addHandler(stdout_handler)
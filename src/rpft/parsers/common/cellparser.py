@@ -1,7 +1,11 @@
-from jinja2 import Environment, contextfilter
+import functools
+import re
+
+from jinja2 import Environment, TemplateSyntaxError, contextfilter, meta, nodes
 from jinja2.nativetypes import NativeEnvironment
 
 from rpft.logger.logger import get_logger
+from rpft.stats import stats
 
 LOGGER = get_logger()
 
@@ -10,6 +14,18 @@ class CellParserError(Exception):
     pass
 
 
+@functools.lru_cache(maxsize=1024)
+def compile_expression(expression):
+    # The same expressions are typically evaluated many times, e.g. once
+    # per row of a data sheet, so we only compile each of them once.
+    return compile(expression, "<string>", "eval")
+
+
+def evaluate_expression(expression, context):
+    # Equivalent to eval(expression, {}, context)
+    return eval(compile_expression(expression), {}, context)
+
+
 class CellParser:
     class BooleanWrapper:
         def __init__(self, val=False):
@@ -19,6 +35,12 @@ class CellParser:
     # Note: split_into_lists currently assumes there are exactly two separators.
     SEPARATORS = ["|", ";"]
     ESCAPE_CHARACTER = "\\"
+    # Matches escape sequences and separators of all levels.
+    # Escape sequences are matched so that escaped separators are skipped.
+    TOKEN_REGEX = re.compile(
+        re.escape(ESCAPE_CHARACTER) + ".|[" + re.escape("".join(SEPARATORS)) + "]",
+        re.DOTALL,
+    )
 
     def escape_string(string):
         string = string.replace(
@@ -30,7 +52,7 @@ class CellParser:
 
     @contextfilter
     def evaluate_string(context, string):
-        return eval(string, {}, context)
+        return evaluate_expression(string, context)
 
     def __init__(self):
         self.env = Environment()
@@ -41,14 +63,58 @@ class CellParser:
         )
         self.native_env.filters["escape"] = CellParser.escape_string
         self.native_env.filters["eval"] = CellParser.evaluate_string
+        # Cache for get_template_variables
+        self.template_variables = {}
 
     def split_into_lists(self, string):
-        l1 = self.split_by_separator(string, CellParser.SEPARATORS[0])
-        if type(l1) is str:
-            output = self.split_by_separator(string, CellParser.SEPARATORS[1])
-        else:
-            output = [self.split_by_separator(s, CellParser.SEPARATORS[1]) for s in l1]
-        return self.cleanse(output)
+        # Single pass equivalent of splitting by the first separator via
+        # split_by_separator, then splitting each part by the second separator,
+        # and finally applying cleanse to the result.
+        if CellParser.ESCAPE_CHARACTER not in string and not any(
+            sep in string for sep in CellParser.SEPARATORS
+        ):
+            return string.strip()
+        outer_sep, inner_sep = CellParser.SEPARATORS
+        outer = []  # completed entries of the first level
+        inner = []  # completed entries of the second level of the current entry
+        start = 0  # start of the current second level entry
+        entry_start = 0  # start of the current first level entry
+        for match in CellParser.TOKEN_REGEX.finditer(string):
+            token = match.group()
+            if token == inner_sep:
+                inner.append(self._unescape(string[start : match.start()]))
+                start = match.end()
+            elif token == outer_sep:
+                outer.append(self._end_entry(inner, string[start : match.start()]))
+                inner = []
+                start = match.end()
+                entry_start = start
+        if not outer:
+            return self._end_entry(inner, string[start:])
+        if entry_start < len(string):
+            # Special case: If the last character is a separator,
+            # we don't put '' at the end of the list
+            outer.append(self._end_entry(inner, string[start:]))
+        return outer
+
+    def _end_entry(self, inner, last_part):
+        # Complete a first level entry, given the preceding second level entries
+        # and the remaining part of the entry.
+        if not inner:
+            # No separators found: a string, not a list
+            return self._unescape(last_part)
+        if last_part:
+            # Special case: If the last character is a separator,
+            # we don't put '' at the end of the list
+            inner.append(self._unescape(last_part))
+        return inner
+
+    def _unescape(self, string):
+        # Equivalent to cleanse for a single string
+        string = string.strip()
+        if CellParser.ESCAPE_CHARACTER in string:
+            return self.cleanse(string)
+        return string
 
     def cleanse(self, nested_list):
         # Unescape escaped characters
@@ -88,6 +154,37 @@ class CellParser:
                 for i in range(len(locations) - 1)
             ]
 
+    def get_template_variables(self, value):
+        """
+        Get the names of the context variables that the templates within value
+        refer to, as a frozenset. Returns None if these cannot be determined
+        statically, e.g. because the eval filter is used.
+        """
+        if value is None:
+            return frozenset()
+        value = str(value)
+        if "{" not in value:
+            return frozenset()
+        if value not in self.template_variables:
+            self.template_variables[value] = self._find_template_variables(
+                value.strip()
+            )
+        return self.template_variables[value]
+
+    def _find_template_variables(self, stripped_value):
+        env = self.env
+        if stripped_value.startswith("{@") and stripped_value.endswith("@}"):
+            env = self.native_env
+        try:
+            ast = env.parse(stripped_value)
+        except TemplateSyntaxError:
+            return None
+        # eval may access arbitrary variables via strings computed at runtime
+        for node in ast.find_all(nodes.Filter):
+            if node.name == "eval":
+                return None
+        return frozenset(meta.find_undeclared_variables(ast))
+
     def parse(self, value, context={}):
         is_object = CellParser.BooleanWrapper()
         value = self.parse_as_string(value, context, is_object)
@@ -124,13 +221,15 @@ class CellParser:
                 is_object.boolean = True
             env = self.native_env
 
+        stats.count("cells templated")
         try:
             template = env.from_string(stripped_value)
             return template.render(context)
         except Exception as e:
+            # The context may be layered (a ChainMap), so we log its merged content
             LOGGER.critical(
-                f'Error while parsing cell "{stripped_value}" with context "{context}":'
-                f" {str(e)}"
+                f'Error while parsing cell "{stripped_value}" '
+                f'with context "{dict(context)}": {str(e)}'
             )
 
     def join_from_lists(self, value, depth=0):
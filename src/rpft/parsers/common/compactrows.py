@@ -0,0 +1,56 @@
+import sys
+from collections.abc import Mapping
+
+
+def intern_value(value):
+    if type(value) is str:
+        return sys.intern(value)
+    return value
+
+
+class CompactRows(Mapping):
+    def __init__(self, row_model, items=()):
+        """
+        Read-only mapping from row IDs to row model instances, which stores
+        the values of the rows column by column, with strings interned.
+
+        Model instances are created (without validation) whenever a row is
+        accessed, and not retained. The rows should not be modified.
+
+        Args:
+            row_model: the model underlying the rows.
+            items: iterable of (row_id, row_model instance) pairs. As for dicts,
+                later rows replace earlier rows with the same row_id.
+        """
+        self.row_model = row_model
+        self.fields = list(row_model.__fields__)
+        self.columns = [[] for _ in self.fields]
+        self.positions = {}
+        for row_id, row in items:
+            self.add(row_id, row)
+
+    def add(self, row_id, row):
+        values = [intern_value(getattr(row, field)) for field in self.fields]
+        position = self.positions.get(row_id)
+        if position is None:
+            self.positions[row_id] = len(self.positions)
+            for column, value in zip(self.columns, values):
+                column.append(value)
+        else:
+            for column, value in zip(self.columns, values):
+                column[position] = value
+
+    def __getitem__(self, row_id):
+        position = self.positions[row_id]
+        return self.row_model.construct(
+            **{
+                field: column[position]
+                for field, column in zip(self.fields, self.columns)
+            }
+        )
+
+    def __iter__(self):
+        return iter(self.positions)
+
+    def __len__(self):
+        return len(self.positions)
@@ -1,4 +1,3 @@
-import networkx as nx
 import tablib
 
 
@@ -50,36 +49,54 @@ class RowDataSheet:
           A tablib.Dataset representation of the data.
         """
 
+        row_dicts = self._unparse_rows()
         data = tablib.Dataset()
-        data.headers = self._get_headers()
-        for row in self.rows:
-            row_dict = self.row_parser.unparse_row(
-                row, self.target_headers, self.excluded_headers
-            )
+        data.headers = self._get_headers(row_dicts)
+        for row_dict in row_dicts:
             data.append([row_dict.get(header, "") for header in data.headers])
         return data
 
-    def _get_headers(self):
+    def _unparse_rows(self):
+        return [
+            self.row_parser.unparse_row(row, self.target_headers, self.excluded_headers)
+            for row in self.rows
+        ]
+
+    def _get_headers(self, row_dicts=None):
         """
         Get an ordered list of column headers.
         Each row contains a subset of the final set of column headers.
-        These subsets need to be merged while respecting the relative order
-        within each row. Note: The resulting set of headers is unique,
+        If the row parser provides a canonical header order (derived from
+        the DataModel of the rows), the union of these subsets is sorted
+        accordingly, which makes the order unique.
+        Otherwise, these subsets need to be merged while respecting the relative
+        order within each row. Note: The resulting set of headers is unique,
         however, their order is not guaranteed to be unique.
-        TODO: A better approach would be to use the DataModel of the rows
-        to uniquely infer the order of the headers.
+        Args:
+            row_dicts (list[dict]): the rows converted via unparse_row,
+                if already available.
         Return:
             A list of strings representing the column headers of the sheet.
         """
 
+        if row_dicts is None:
+            row_dicts = self._unparse_rows()
+
+        sort_headers = getattr(self.row_parser, "sort_headers", None)
+        if sort_headers:
+            headers = {}
+            for row_dict in row_dicts:
+                headers.update(dict.fromkeys(row_dict))
+            return sort_headers(headers)
+
+        # networkx is slow to import and only needed here, so we import it lazily.
+        import networkx as nx
+
         # Create a graph (representing a poset) whose nodes are the column headers,
         # and whose edges A -> B represent that column header A should come before
         # column header B.
         header_graph = nx.DiGraph()
-        for row in self.rows:
-            row_dict = self.row_parser.unparse_row(
-                row, self.target_headers, self.excluded_headers
-            )
+        for row_dict in row_dicts:
             k_prev = None
             # For each pair of consecutive headers in this row, add an edge.
             for k, _ in row_dict.items():
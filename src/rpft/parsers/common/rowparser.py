@@ -1,3 +1,5 @@
+import functools
+import math
 import re
 from collections import defaultdict
 from collections.abc import Iterable
@@ -75,12 +77,87 @@ def is_basic_instance(value):
     return isinstance(value, (str, int, float, bool))
 
 
-def is_default_value(model_instance, field, field_value):
+@functools.lru_cache(maxsize=256)
+def get_default_values(model):
+    # Map each field of a model to its default value.
+    # ModelField.get_default deep-copies mutable defaults, so we compute the
+    # defaults once per model rather than once per comparison.
+    # The cached values must not be modified.
     # Note: In pydantic V2, __fields__ will become model_fields
-    if field_value == type(model_instance).__fields__[field].get_default():
+    return {
+        field: model_field.get_default()
+        for field, model_field in model.__fields__.items()
+    }
+
+
+def is_default_value(model_instance, field, field_value):
+    if field_value == get_default_values(type(model_instance))[field]:
         return True
 
 
+class HeaderMatcher:
+    # Matches field prefixes (as generated by unparse_row_recurse) against
+    # a set of headers, such as target_headers and excluded_headers.
+    # All headers are compiled into a single regex once, rather than
+    # compiling one regex per header on each check.
+
+    def __init__(self, headers):
+        # Examples:
+        #     a.b.field matches a.b.field
+        #     list.1 matches list.1
+        #     list.1 matches list.*
+        #     list.1.field matches list.*.field
+        #     dict.field matches dict.*
+        # Technically, x.field.subfield matches x.field; however, such a comparison
+        # will never occur in unparse_row_recurse because once x.field is
+        # encountered, the recursion bottoms out (because x.field matches x.field)
+        # and does not proceed to process the x.field.subfield prefix.
+        header_regexes = [
+            "(?:" + header.replace(".", "\\.").replace("*", "[^.]+") + ")"
+            for header in sorted(headers)
+        ]
+        if header_regexes:
+            self.pattern = re.compile("|".join(header_regexes))
+        else:
+            self.pattern = None
+
+    def matches(self, prefix):
+        if not prefix or self.pattern is None:
+            return False
+        # Field prefixes start with a '.', which is not part of the header
+        if prefix.startswith(RowParser.HEADER_FIELD_SEPARATOR):
+            prefix = prefix[1:]
+        return self.pattern.match(prefix) is not None
+
+
+def get_header_matcher(headers):
+    # The same sets of headers are used for every row of a sheet,
+    # so matchers are only compiled once per set of headers.
+    return compile_header_matcher(frozenset(headers))
+
+
+@functools.lru_cache(maxsize=1024)
+def compile_header_matcher(headers):
+    return HeaderMatcher(headers)
+
+
+@functools.lru_cache(maxsize=256)
+def get_header_positions(model):
+    # Map each top-level column header of a model (as produced by
+    # field_name_to_header_name) to the position of the first field that is
+    # mapped to it, and to the model of that field. As unparse_row does not
+    # recurse into remapped fields, the model is None in that case.
+    # The result only depends on the model, so it is computed once per model.
+    positions = {}
+    for index, (field, model_field) in enumerate(model.__fields__.items()):
+        header = model.field_name_to_header_name(field)
+        if header in positions:
+            continue
+        child_model = model_field.outer_type_ if header == field else None
+        positions[header] = (index, child_model)
+    return positions
+
+
 class RowParser:
     # Takes a dictionary of cell entries, whose keys are the column names
     # and the values are the cell content converted into nested lists.
@@ -354,6 +431,18 @@ class RowParser:
         self.output = {k: v for k, v in self.output.items() if v is not None}
         return self.model(**self.output)
 
+    def get_template_variables(self, data):
+        # Names of the context variables that the templates within the cells
+        # of data (see parse_row) refer to, or None if these cannot be
+        # determined statically.
+        variables = set()
+        for value in data.values():
+            value_variables = self.cell_parser.get_template_variables(value)
+            if value_variables is None:
+                return None
+            variables |= value_variables
+        return frozenset(variables)
+
     def unparse_row(self, model_instance, target_headers=set(), excluded_headers=set()):
         """
         Turn a model instance into spreadsheet row.
@@ -380,7 +469,12 @@ class RowParser:
             represented as a single string.
         """
         self.output_dict = {}
-        self.unparse_row_recurse(model_instance, "", target_headers, excluded_headers)
+        self.unparse_row_recurse(
+            model_instance,
+            "",
+            target_matcher=get_header_matcher(target_headers),
+            excluded_matcher=get_header_matcher(excluded_headers),
+        )
         return self.output_dict
 
     def trim_prefix(self, prefix):
@@ -403,20 +497,42 @@ class RowParser:
         self.output_dict[prefix] = value
 
     def unparse_row_recurse(
-        self, value, prefix, target_headers=set(), excluded_headers=set()
+        self,
+        value,
+        prefix,
+        target_headers=set(),
+        excluded_headers=set(),
+        target_matcher=None,
+        excluded_matcher=None,
     ):
-        if value is None or self.matches_headers(prefix, excluded_headers):
+        """
+        Args:
+            value: value to write into the output dict
+            prefix (str): field prefix of value, with a leading separator
+            target_headers (set[str]): see unparse_row
+            excluded_headers (set[str]): see unparse_row
+            target_matcher (HeaderMatcher): matcher for the target headers, which
+                is looked up from target_headers if not given
+            excluded_matcher (HeaderMatcher): matcher for the excluded headers,
+                which is looked up from excluded_headers if not given
+        """
+        if target_matcher is None:
+            target_matcher = get_header_matcher(target_headers)
+        if excluded_matcher is None:
+            excluded_matcher = get_header_matcher(excluded_headers)
+
+        if value is None or excluded_matcher.matches(prefix):
             return
 
-        if is_basic_instance(value) or self.matches_headers(prefix, target_headers):
+        if is_basic_instance(value) or target_matcher.matches(prefix):
             self.write_to_output_dict(prefix, value)
         elif is_list_instance(value):
             for i, entry in enumerate(value):
                 self.unparse_row_recurse(
                     entry,
                     f"{prefix}{RowParser.HEADER_FIELD_SEPARATOR}{i+1}",
-                    target_headers,
-                    excluded_headers,
+                    target_matcher=target_matcher,
+                    excluded_matcher=excluded_matcher,
                 )
         elif is_parser_model_instance(value):
             for field, field_value in value:
@@ -431,8 +547,8 @@ class RowParser:
                     self.unparse_row_recurse(
                         field_value,
                         field_prefix,
-                        target_headers,
-                        excluded_headers,
+                        target_matcher=target_matcher,
+                        excluded_matcher=excluded_matcher,
                     )
                 else:
                     # If a remapping occurs, we allow no further recursion.
@@ -440,31 +556,49 @@ class RowParser:
                     # and a string to the same key `mapped_field`, the string
                     # might generate a column `mapped_field` while the list may
                     # generated columns `mapped_field.1` and `mapped_field.2`.
-                    if not self.matches_headers(field_prefix, excluded_headers):
+                    if not excluded_matcher.matches(field_prefix):
                         self.write_to_output_dict(field_prefix, field_value)
         else:
             raise ValueError(f"Unsupported field type {type(value)} of {value}.")
 
-    def matches_headers(self, prefix, target_headers):
-        if not prefix:
-            return False
-        prefix = self.trim_prefix(prefix)
-        # Examples:
-        #     a.b.field matches a.b.field
-        #     list.1 matches list.1
-        #     list.1 matches list.*
-        #     list.1.field matches list.*.field
-        #     dict.field matches dict.*
-        # Technically, x.field.subfield matches x.field; however, such a comparison
-        # will never occur in unparse_row_recurse because once x.field is encountered,
-        # the recursion bottoms out (because x.field matches x.field) and does not
-        # proceed to process the x.field.subfield prefix.
-        for header in target_headers:
-            header_regex = "^" + header.replace(".", "\\.").replace("*", "[^.]+")
-            pattern = re.compile(header_regex)
-            if pattern.match(prefix):
-                return True
-        return False
+    def header_sort_key(self, header):
+        """
+        Get the sort key of a column header produced by unparse_row.
+
+        The key is derived from the field order of the model and the list
+        indices within the header, so that sorting by it reproduces the
+        order in which unparse_row emits the entries of a single row.
+        Components that cannot be resolved against the model are sorted last,
+        with the header itself as tie-breaker to keep the order unique.
+        """
+        key = []
+        model = self.model
+        for component in header.split(RowParser.HEADER_FIELD_SEPARATOR):
+            if is_parser_model_type(model):
+                position, model = get_header_positions(model).get(
+                    component, (math.inf, None)
+                )
+            else:
+                position = int(component) if component.isdigit() else math.inf
+                if model is not None and is_list_type(model):
+                    model = model.__args__[0]
+                else:
+                    model = None
+            key.append(position)
+        return (tuple(key), header)
+
+    def sort_headers(self, headers):
+        """
+        Sort column headers produced by unparse_row into canonical order.
+
+        Args:
+            headers (Iterable[str]): headers to sort, e.g. the union of the
+                keys of the outputs of unparse_row for all rows of a sheet.
+
+        Returns:
+            A list of the headers, sorted according to header_sort_key.
+        """
+        return sorted(headers, key=self.header_sort_key)
 
     def to_nested_list(self, value):
         if is_basic_instance(value):
@@ -1,27 +1,42 @@
-import copy
+from collections import ChainMap
+
 from rpft.parsers.common.rowdatasheet import RowDataSheet
 from rpft.logger.logger import get_logger, logging_context
+from rpft.stats import stats
 
 LOGGER = get_logger()
 
+# Placeholder for variables that are missing from the context
+MISSING = object()
+
 
 class SheetParser:
     def __init__(self, row_parser, table, context={}):
         """
         Args:
             row_parser: parser to convert flat dicts to RowModel instances.
-            context: context used for template parsing
+            context: context used for template parsing. It is not copied:
+                variables added via add_to_context are stored in a separate
+                layer on top of it, so the context itself is never modified.
             table: Tablib Dataset representing the table to be parsed.
         """
 
         self.row_parser = row_parser
+        # Bookmark name -> cursor
         self.bookmarks = {}
-        self.input_rows = []
-        for row_idx, row in enumerate(table):
-            row_dict = {h: e for h, e in zip(table.headers, row)}
-            self.input_rows.append((row_dict, row_idx + 2))
-        self.iterator = iter(self.input_rows)
-        self.context = copy.deepcopy(context)
+        # The rows are kept as tuples; dicts mapping headers to cell content
+        # are only created for the rows that are parsed.
+        self.headers = tuple(table.headers or ())
+        self.rows = tuple(table)
+        # Positions (within self.rows) of the rows to be parsed, in order
+        self.positions = range(len(self.rows))
+        # Index into self.positions of the next row to be parsed
+        self.cursor = 0
+        self.context = ChainMap({}, context)
+        # Row index -> template variables of the row (see _parse_row_memoized)
+        self.row_variables = {}
+        # Row index -> (values of the template variables, parsed row)
+        self.row_cache = {}
 
     def add_to_context(self, key, value):
         self.context[key] = value
@@ -30,32 +45,79 @@ class SheetParser:
         self.context.pop(key)
 
     def create_bookmark(self, name):
-        self.bookmarks[name] = copy.copy(self.iterator)
+        self.bookmarks[name] = self.cursor
 
     def go_to_bookmark(self, name):
-        self.iterator = copy.copy(self.bookmarks[name])
+        self.cursor = self.bookmarks[name]
 
     def remove_bookmark(self, name):
         self.bookmarks.pop(name)
 
     def parse_next_row(self, omit_templating=False, return_index=False):
-        try:
-            input_row, row_idx = next(self.iterator)
-        except StopIteration:
+        if self.cursor >= len(self.positions):
             return (None, None) if return_index else None
-        context = self.context if not omit_templating else None
-        with logging_context(f"row {row_idx}"):
-            row = self.row_parser.parse_row(input_row, context)
+        position = self.positions[self.cursor]
+        self.cursor += 1
+        input_row = self.get_input_row(position)
+        stats.count("rows parsed")
+        # Row index within the spreadsheet (1-based, after the header row)
+        row_idx = position + 2
+        if omit_templating:
+            with logging_context("row {}", row_idx):
+                row = self.row_parser.parse_row(input_row, None)
+        elif self.bookmarks:
+            # We're within a loop, so rows may be parsed repeatedly.
+            row = self._parse_row_memoized(input_row, row_idx)
+        else:
+            with logging_context("row {}", row_idx):
+                row = self.row_parser.parse_row(input_row, self.context)
         return (row, row_idx) if return_index else row
 
+    def get_input_row(self, position):
+        return dict(zip(self.headers, self.rows[position]))
+
+    def _parse_row_memoized(self, input_row, row_idx):
+        # Reuse the previously parsed row if none of the variables that
+        # the templates within the row refer to has changed (e.g. if the row
+        # does not depend on the loop variable).
+        if row_idx not in self.row_variables:
+            get_template_variables = getattr(
+                self.row_parser, "get_template_variables", None
+            )
+            self.row_variables[row_idx] = (
+                get_template_variables(input_row) if get_template_variables else None
+            )
+        variables = self.row_variables[row_idx]
+        if variables is not None:
+            values = [self.context.get(variable, MISSING) for variable in variables]
+            if row_idx in self.row_cache:
+                cached_values, row = self.row_cache[row_idx]
+                if all(a is b for a, b in zip(cached_values, values)):
+                    stats.count("row cache hits")
+                    return row
+        with logging_context("row {}", row_idx):
+            row = self.row_parser.parse_row(input_row, self.context)
+        if variables is not None:
+            self.row_cache[row_idx] = (values, row)
+        return row
+
     def parse_all(self):
-        self.iterator = iter(self.input_rows)
-        output_rows = []
+        return list(self.parse_rows())
+
+    def parse_rows(self, positions=None):
+        """
+        Parse all rows, yielding each parsed row.
+
+        Args:
+            positions: optional list of the positions (indices into the rows of
+                the table) of the rows to parse. By default, all rows are parsed.
+        """
+        self.positions = range(len(self.rows)) if positions is None else positions
+        self.cursor = 0
         row = self.parse_next_row()
         while row is not None:
-            output_rows.append(row)
+            yield row
             row = self.parse_next_row()
-        return output_rows
 
     def get_row_data_sheet(self):
         rows = self.parse_all()
@@ -11,7 +11,7 @@ class CampaignParser:
 
     def parse(self):
         for row_idx, row in enumerate(self.rows):
-            with logging_context(f"row {row_idx+2}"):
+            with logging_context("row {}", row_idx + 2):
                 message = None
                 base_language = None
                 if row.message:
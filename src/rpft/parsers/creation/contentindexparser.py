@@ -1,19 +1,35 @@
 import importlib
-from collections import OrderedDict
-
-from rpft.logger.logger import get_logger, logging_context
-from rpft.parsers.common.cellparser import CellParser
-from rpft.parsers.common.rowparser import RowParser
+import operator
+from collections import ChainMap, OrderedDict
+from typing import Optional
+
+from pydantic import create_model
+
+from rpft.logger.logger import (
+    ProcessingError,
+    error_boundary,
+    get_logger,
+    logging_context,
+)
+from rpft.parsers.common.cellparser import (
+    CellParser,
+    compile_expression,
+    evaluate_expression,
+)
+from rpft.parsers.common.compactrows import CompactRows
+from rpft.parsers.common.rowparser import RowParser, get_default_values
 from rpft.parsers.common.sheetparser import SheetParser
 from rpft.parsers.creation.campaigneventrowmodel import CampaignEventRowModel
 from rpft.parsers.creation.campaignparser import CampaignParser
 from rpft.parsers.creation.contentindexrowmodel import ContentIndexRowModel
-from rpft.parsers.creation.flowparser import FlowParser
+from rpft.parsers.creation.flowparser import FlowParser, clone_node_group
 from rpft.parsers.creation.tagmatcher import TagMatcher
 from rpft.parsers.creation.triggerparser import TriggerParser
 from rpft.parsers.creation.triggerrowmodel import TriggerRowModel
 from rpft.parsers.sheets import Sheet
 from rpft.rapidpro.models.containers import RapidProContainer
+from rpft.rapidpro.utils import uuid_scope
+from rpft.stats import stats
 
 LOGGER = get_logger()
 
@@ -27,46 +43,196 @@ class TemplateSheet:
 class DataSheet:
     def __init__(self, rows, row_model):
         """Args:
-        rows: A dict mapping row_ids (str) to row_model instances.
+        rows: A dict (or CompactRows) mapping row_ids (str) to row_model
+            instances.
         row_model: the model underlying the instances of rows.
         """
         self.rows = rows
         self.row_model = row_model
 
 
+class GroupedDataSheet:
+    def __init__(self, groups, row_model):
+        """
+        Result of a group_by operation. Its rows are lists of rows, so it can only
+        be passed to templates as a sheet argument, and not be used by further
+        operations, with a data_row_id or to create a flow for each row.
+
+        Args:
+            groups: A dict mapping the keys of the groups (str) to lists of
+                row_model instances.
+            row_model: the model underlying the instances in the groups.
+        """
+        self.rows = groups
+        self.row_model = row_model
+
+
+class DeferredDataSheet:
+    def __init__(self, row, data_sheets, logging_prefix):
+        """
+        Definition of a data sheet which is only built when it is first needed.
+
+        Args:
+            row: the data_sheet row (ContentIndexRowModel) defining the sheet.
+            data_sheets: the data sheets (DataSheet or DeferredDataSheet) defined
+                before this one that the definition refers to, by name.
+            logging_prefix: logging context of the content index row.
+        """
+        self.row = row
+        self.data_sheets = data_sheets
+        self.logging_prefix = logging_prefix
+        self.data_sheet = None
+        # ProcessingError raised when building the sheet failed in keep-going mode
+        self.error = None
+
+
 class ParserError(Exception):
     pass
 
 
+# Value of an expression that could not be evaluated
+INVALID = object()
+
+
+def _freeze(value):
+    # Hashable version of a (nested) list, e.g. of template arguments
+    if isinstance(value, list):
+        return tuple(_freeze(entry) for entry in value)
+    return value
+
+
+def get_code_names(code):
+    # All names referenced by a code object, including nested code objects
+    # such as those of comprehensions and lambdas.
+    names = set(code.co_names)
+    for const in code.co_consts:
+        if hasattr(const, "co_names"):
+            names |= get_code_names(const)
+    return names
+
+
+def _get_operations(row):
+    # Blank operations.N columns are parsed as operations without a type
+    operations = [operation for operation in row.operations if operation.type]
+    if row.operation.type:
+        operations.insert(0, row.operation)
+    return operations
+
+
+def get_raw_filter_fields(row_model, expression):
+    """
+    Determine whether a filter expression can be evaluated on unparsed rows.
+
+    This is the case if all fields of the row model that the expression
+    references, as well as the ID field, are plain string fields, whose value
+    in the model instance is the content of the cell (unless the cell contains
+    a template).
+
+    Returns:
+        The set of fields referenced by the expression, or None if the expression
+        cannot be evaluated on unparsed rows.
+    """
+    try:
+        code = compile_expression(expression)
+    except SyntaxError:
+        return None
+    fields = get_code_names(code) & row_model.__fields__.keys()
+    config = row_model.__config__
+    if (
+        "ID" not in row_model.__fields__
+        or row_model.__pre_root_validators__
+        or row_model.__post_root_validators__
+        or config.anystr_strip_whitespace
+        or config.anystr_lower
+        or config.anystr_upper
+    ):
+        return None
+    for field in fields | {"ID"}:
+        if (
+            row_model.__fields__[field].outer_type_ is not str
+            or field in row_model.__validators__
+        ):
+            return None
+    return fields
+
+
+class SortKey:
+    TYPES = {
+        "": lambda value: value,
+        "str": str,
+        "numeric": float,
+    }
+
+    def __init__(self, spec, default_order=""):
+        """
+        Args:
+            spec (str): a field or dotted path to a field, optionally followed by
+                a type (:numeric or :str) and a direction (ascending or
+                descending), e.g. "priority:numeric descending".
+            default_order (str): direction if spec does not contain one.
+        """
+        words = spec.split()
+        if not words or len(words) > 2:
+            raise ValueError(f'Invalid sort key "{spec}"')
+        order = words[1] if len(words) == 2 else default_order or "ascending"
+        if order.lower() not in ["ascending", "descending"]:
+            raise ValueError(f'Invalid sort order "{order}" in sort key "{spec}"')
+        path, _, value_type = words[0].partition(":")
+        if value_type not in SortKey.TYPES:
+            raise ValueError(f'Invalid type "{value_type}" in sort key "{spec}"')
+        self.name = words[0]
+        self.reverse = order.lower() == "descending"
+        self.getter = operator.attrgetter(path)
+        self.converter = SortKey.TYPES[value_type]
+
+    def __call__(self, row):
+        return self.converter(self.getter(row))
+
+    def parse_keys(specs, default_order=""):
+        return [SortKey(spec, default_order) for spec in specs.split(",")]
+
+
 class ContentIndexParser:
+    DATA_SHEET_OPERATIONS = ["concat", "filter", "sort", "index", "group_by", "join"]
+
     def __init__(
         self,
         sheet_reader=None,
         user_data_model_module_name=None,
         tag_matcher=TagMatcher(),
+        compact_data_sheets=False,
     ):
         self.reader = sheet_reader
         self.tag_matcher = tag_matcher
+        # Whether to store the rows of data sheets as CompactRows
+        self.compact_data_sheets = compact_data_sheets
         self.template_sheets = {}
+        # name-indexed dict of DataSheet or DeferredDataSheet
         self.data_sheets = {}
+        # data sheets that names in data sheet definitions refer to,
+        # while a DeferredDataSheet is being built
+        self.data_sheet_scope = self.data_sheets
         self.flow_definition_rows = []  # list of ContentIndexRowModel
         self.campaign_parsers = {}  # name-indexed dict of CampaignParser
         self.trigger_parsers = []
+        # Node groups of inserted blocks, see get_node_group
+        self.node_group_cache = {}
 
         if user_data_model_module_name:
             self.user_models_module = importlib.import_module(
                 user_data_model_module_name
             )
 
-        indices = self.reader.get_sheets_by_name("content_index")
+        with stats.timer("process content index"):
+            indices = self.reader.get_sheets_by_name("content_index")
 
-        if not indices:
-            LOGGER.critical("No content index sheet provided")
+            if not indices:
+                LOGGER.critical("No content index sheet provided")
 
-        for sheet in indices:
-            self._process_content_index_table(sheet)
+            for sheet in indices:
+                self._process_content_index_table(sheet)
 
-        self._populate_missing_templates()
+            self._populate_missing_templates()
 
     def _process_content_index_table(self, sheet: Sheet):
         row_parser = RowParser(ContentIndexRowModel, CellParser())
@@ -74,7 +240,7 @@ class ContentIndexParser:
         content_index_rows = sheet_parser.parse_all()
         for row_idx, row in enumerate(content_index_rows, start=2):
             logging_prefix = f"{sheet.reader.name}-{sheet.name} | row {row_idx}"
-            with logging_context(logging_prefix):
+            with error_boundary(), logging_context(logging_prefix):
                 if row.status == "draft":
                     continue
                 if not self.tag_matcher.matches(row.tags):
@@ -95,7 +261,7 @@ class ContentIndexParser:
                             "For data_sheet rows, at least one "
                             "sheet_name has to be specified"
                         )
-                    self._process_data_sheet(row)
+                    self._process_data_sheet(row, logging_prefix)
                 elif row.type in ["template_definition", "create_flow"]:
                     if row.type == "template_definition":
                         if row.new_name:
@@ -156,7 +322,9 @@ class ContentIndexParser:
 
     def _populate_missing_templates(self):
         for logging_prefix, row in self.flow_definition_rows:
-            with logging_context(f"{logging_prefix} | {row.sheet_name[0]}"):
+            with error_boundary(), logging_context(
+                "{} | {}", logging_prefix, row.sheet_name[0]
+            ):
                 self._add_template(row)
 
     def _get_sheet_or_die(self, sheet_name):
@@ -185,75 +353,182 @@ class ContentIndexParser:
 
         return active
 
-    def _process_data_sheet(self, row):
+    def _process_data_sheet(self, row, logging_prefix):
+        # Data sheets are only built once they are used, see _build_data_sheet.
+        new_name = row.new_name or row.sheet_name[0]
+        if new_name in self.data_sheets:
+            LOGGER.warn(
+                f"Duplicate data sheet {new_name}. Overwriting previous definition."
+            )
+        # Names refer to the data sheets defined so far, even if they are
+        # redefined later on.
+        referenced_data_sheets = {
+            name: self.data_sheets[name]
+            for name in row.sheet_name
+            if name in self.data_sheets
+        }
+        data_sheet = DeferredDataSheet(row, referenced_data_sheets, logging_prefix)
+        # The sheet is defined even if the definition is invalid, so that in
+        # keep-going mode its users are skipped (see _resolve_data_sheet).
+        self.data_sheets[new_name] = data_sheet
+        try:
+            self._check_data_sheet_definition(row)
+        except ProcessingError as e:
+            data_sheet.error = e
+            raise
+
+    def _check_data_sheet_definition(self, row):
         if not hasattr(self, "user_models_module"):
             LOGGER.critical(
                 "If there are data sheets, a user_data_model_module_name "
                 "has to be provided"
             )
-        sheet_names = row.sheet_name
-        if row.operation.type in ["filter", "sort"] and len(sheet_names) > 1:
-            LOGGER.warning(
-                "data_sheet definition take only one sheet_name for filter and sort "
-                "operations. All but the first sheet_name are ignored."
+        operations = _get_operations(row)
+        if row.operation.type and len(operations) > 1:
+            LOGGER.critical(
+                "data_sheet definitions may either have an operation "
+                "or a list of operations, but not both."
             )
-        if not row.operation.type:
-            if len(sheet_names) > 1:
-                LOGGER.warning(
-                    "Implicitly concatenating data sheets without concat operation. "
-                    "Implicit concatenation is deprecated and may be removed "
-                    "in the future."
-                )
-            data_sheet = self._data_sheets_concat(sheet_names, row.data_model)
-        else:
-            if not row.new_name:
-                LOGGER.critical(
-                    "If an operation is applied to a data_sheet, "
-                    "a new_name has to be provided"
-                )
-            if row.operation.type == "concat":
-                data_sheet = self._data_sheets_concat(sheet_names, row.data_model)
-            elif row.operation.type == "filter":
-                data_sheet = self._data_sheets_filter(
-                    sheet_names[0], row.data_model, row.operation
-                )
-            elif row.operation.type == "sort":
-                data_sheet = self._data_sheets_sort(
-                    sheet_names[0], row.data_model, row.operation
-                )
-            else:
-                LOGGER.critical(f'Unknown operation "{row.operation}"')
-        new_name = row.new_name or sheet_names[0]
-        if new_name in self.data_sheets:
-            LOGGER.warn(
-                f"Duplicate data sheet {new_name}. Overwriting previous definition."
+        if operations and not row.new_name:
+            LOGGER.critical(
+                "If an operation is applied to a data_sheet, "
+                "a new_name has to be provided"
             )
-        self.data_sheets[new_name] = data_sheet
+
+    def _resolve_data_sheet(self, data_sheet):
+        if isinstance(data_sheet, DataSheet):
+            return data_sheet
+        if data_sheet.error is not None:
+            # The error has been reported when the sheet failed to build, so the
+            # user of the sheet is skipped without reporting it again.
+            raise ProcessingError(*data_sheet.error.args)
+        if data_sheet.data_sheet is None:
+            scope = self.data_sheet_scope
+            self.data_sheet_scope = data_sheet.data_sheets
+            try:
+                with logging_context(data_sheet.logging_prefix):
+                    data_sheet.data_sheet = self._build_data_sheet(data_sheet.row)
+            except ProcessingError as e:
+                data_sheet.error = e
+                raise
+            finally:
+                self.data_sheet_scope = scope
+            # The data sheets referenced by the definition are no longer needed
+            data_sheet.data_sheets = None
+        return data_sheet.data_sheet
+
+    def _build_data_sheet(self, row):
+        sheet_names = row.sheet_name
+        operations = _get_operations(row)
+        # This includes the time for parsing the source sheets
+        with stats.timer("data sheet operations"):
+            if not operations:
+                if len(sheet_names) > 1:
+                    LOGGER.warning(
+                        "Implicitly concatenating data sheets without concat "
+                        "operation. Implicit concatenation is deprecated and may be "
+                        "removed in the future."
+                    )
+                return self._data_sheets_concat(sheet_names, row.data_model)
+            else:
+                return self._apply_operations(sheet_names, row.data_model, operations)
 
     def _get_data_sheet(self, sheet_name, data_model_name):
-        if sheet_name in self.data_sheets:
-            return self.data_sheets[sheet_name]
+        if sheet_name in self.data_sheet_scope:
+            data_sheet = self._resolve_data_sheet(self.data_sheet_scope[sheet_name])
+            self._check_not_grouped(
+                data_sheet, sheet_name, "the input of another operation"
+            )
+            return data_sheet
         else:
             return self._get_new_data_sheet(sheet_name, data_model_name)
 
-    def _get_new_data_sheet(self, sheet_name, data_model_name):
+    def _check_not_grouped(self, data_sheet, sheet_name, usage):
+        if isinstance(data_sheet, GroupedDataSheet):
+            LOGGER.critical(
+                f'Data sheet "{sheet_name}" is the result of a group_by operation, '
+                f"so it cannot be {usage}. It can only be passed to templates as a "
+                "sheet argument."
+            )
+
+    def _get_new_data_sheet(self, sheet_name, data_model_name, positions=None):
+        user_model = self._get_user_model(data_model_name)
+        data_table = self._get_sheet_or_die(sheet_name)
+        with logging_context(sheet_name), stats.timer("parse data sheets"):
+            data_table = self._get_sheet_or_die(sheet_name).table
+            row_parser = RowParser(user_model, CellParser())
+            sheet_parser = SheetParser(row_parser, data_table)
+            data_rows = sheet_parser.parse_rows(positions=positions)
+            model_instances = self._make_rows(
+                ((row.ID, row) for row in data_rows), user_model
+            )
+            return DataSheet(model_instances, user_model)
+
+    def _make_rows(self, items, row_model):
+        if self.compact_data_sheets:
+            return CompactRows(row_model, items)
+        return OrderedDict(items)
+
+    def _get_user_model(self, data_model_name):
         if not data_model_name:
             LOGGER.critical("No data_model_name provided for data sheet.")
         try:
-            user_model = getattr(self.user_models_module, data_model_name)
+            return getattr(self.user_models_module, data_model_name)
         except AttributeError:
             LOGGER.critical(
                 f'Undefined data_model_name "{data_model_name}" '
                 f"in {self.user_models_module}."
             )
-        data_table = self._get_sheet_or_die(sheet_name)
-        with logging_context(sheet_name):
-            data_table = self._get_sheet_or_die(sheet_name).table
-            row_parser = RowParser(user_model, CellParser())
-            sheet_parser = SheetParser(row_parser, data_table)
-            data_rows = sheet_parser.parse_all()
-            model_instances = OrderedDict((row.ID, row) for row in data_rows)
-            return DataSheet(model_instances, user_model)
+
+    def _get_raw_filter_positions(self, sheet_name, data_model_name, expression):
+        # If a filter is applied to a sheet that has not been parsed before,
+        # the unfiltered sheet is not needed anywhere else. If possible, we then
+        # evaluate the filter on the unparsed rows, so that rows that are
+        # filtered out are never parsed. Returns the positions of the rows that
+        # pass the filter, or None if this is not possible.
+        user_model = self._get_user_model(data_model_name)
+        fields = get_raw_filter_fields(user_model, expression)
+        if fields is None:
+            return None
+        defaults = get_default_values(user_model)
+
+        def get_raw_values(row):
+            rekeyed_row = {
+                user_model.header_name_to_field_name_with_context(k, row): v
+                for k, v in row.items()
+            }
+            raw_values = {}
+            for field in fields | {"ID"}:
+                if field not in rekeyed_row:
+                    raw_values[field] = defaults[field]
+                elif rekeyed_row[field] is None:
+                    raw_values[field] = ""
+                else:
+                    raw_values[field] = str(rekeyed_row[field])
+            return raw_values
+
+        table = self._get_sheet_or_die(sheet_name).table
+        headers = table.headers or ()
+        row_ids = set()
+        rows_raw_values = []
+        for values in table:
+            raw_values = get_raw_values(dict(zip(headers, values)))
+            if any(value is None or "{" in value for value in raw_values.values()):
+                # Templated cells are only known after parsing the row,
+                # and missing required fields fail when parsing the row.
+                return None
+            if raw_values["ID"] in row_ids:
+                # Among duplicate rows, the order depends on rows that may be
+                # filtered out, so all of them need to be parsed.
+                return None
+            row_ids.add(raw_values.pop("ID"))
+            rows_raw_values.append(raw_values)
+
+        return [
+            position
+            for position, raw_values in enumerate(rows_raw_values)
+            if self._evaluate_filter(expression, raw_values)
+        ]
 
     def _data_sheets_concat(self, sheet_names, data_model_name):
         all_data_rows = OrderedDict()
@@ -268,31 +543,136 @@ class ContentIndexParser:
                     )
                 user_model = data_sheet.row_model
                 all_data_rows.update(data_sheet.rows)
-        return DataSheet(all_data_rows, user_model)
+        return DataSheet(self._make_rows(all_data_rows.items(), user_model), user_model)
 
-    def _data_sheets_filter(self, sheet_name, data_model_name, operation):
-        data_sheet = self._get_data_sheet(sheet_name, data_model_name)
-        new_row_data = OrderedDict()
-        for rowID, row in data_sheet.rows.items():
-            try:
-                if eval(operation.expression, {}, dict(row)) is True:
-                    new_row_data[rowID] = row
-            except NameError as e:
-                LOGGER.critical(f"Invalid filtering expression: {e}")
-            except SyntaxError as e:
+    def _evaluate_filter(self, expression, context):
+        return self._evaluate(expression, context, "filtering") is True
+
+    def _evaluate_key(self, expression, row, purpose):
+        # Returns None if the expression is invalid, in which case the row is
+        # dropped (if critical errors don't stop processing).
+        key = self._evaluate(expression, dict(row), purpose, invalid=INVALID)
+        return None if key is INVALID else str(key)
+
+    def _evaluate(self, expression, context, purpose, invalid=None):
+        try:
+            return evaluate_expression(expression, context)
+        except NameError as e:
+            LOGGER.critical(f"Invalid {purpose} expression: {e}")
+        except SyntaxError as e:
+            LOGGER.critical(
+                f'Invalid {purpose} expression: "{e.text}". '
+                f"SyntaxError at line {e.lineno} character {e.offset}"
+            )
+        return invalid
+
+    def _apply_operations(self, sheet_names, data_model_name, operations):
+        """
+        Apply a sequence of operations to data sheets, and return the result.
+
+        The rows are passed from one operation to the next as a stream of
+        (row_id, row) pairs, so that no intermediate data sheets are created.
+        Only sorting needs to hold all rows at once.
+
+        If the first operation is concat, it concatenates all sheet_names.
+        Otherwise, the first sheet_name is the input of the first operation,
+        and each join operation joins with the next of the sheet_names.
+        """
+        operation_types = [operation.type for operation in operations]
+        for operation_type in operation_types:
+            if operation_type not in ContentIndexParser.DATA_SHEET_OPERATIONS:
+                LOGGER.critical(f'Unknown operation "{operation_type}"')
+        if "concat" in operation_types[1:]:
+            LOGGER.critical("concat can only be the first operation.")
+        if "group_by" in operation_types[:-1]:
+            LOGGER.critical("group_by can only be the last operation.")
+        n_joins = operation_types.count("join")
+        if operation_types[0] == "concat":
+            if n_joins:
+                LOGGER.critical("concat and join operations cannot be combined.")
+            data_sheet = self._data_sheets_concat(sheet_names, data_model_name)
+            operations = operations[1:]
+            join_sheet_names = []
+        else:
+            if n_joins and len(sheet_names) != n_joins + 1:
                 LOGGER.critical(
-                    f'Invalid filtering expression: "{e.text}". '
-                    f"SyntaxError at line {e.lineno} character {e.offset}"
+                    "data_sheet definitions take one sheet_name, followed by "
+                    "one sheet_name for each join operation."
+                )
+            elif len(sheet_names) > n_joins + 1:
+                LOGGER.warning(
+                    "data_sheet definition take only one sheet_name for filter, "
+                    "sort, index and group_by operations. "
+                    "All but the first sheet_name are ignored."
+                )
+            if (
+                operation_types[0] == "filter"
+                and sheet_names[0] not in self.data_sheet_scope
+            ):
+                positions = self._get_raw_filter_positions(
+                    sheet_names[0], data_model_name, operations[0].expression
+                )
+            else:
+                positions = None
+            if positions is not None:
+                data_sheet = self._get_new_data_sheet(
+                    sheet_names[0], data_model_name, positions
+                )
+                operations = operations[1:]
+            else:
+                data_sheet = self._get_data_sheet(sheet_names[0], data_model_name)
+            join_sheet_names = sheet_names[1:]
+
+        rows = data_sheet.rows.items()
+        row_model = data_sheet.row_model
+        for operation in operations:
+            if operation.type == "filter":
+                rows = self._filter_rows(rows, operation)
+            elif operation.type == "sort":
+                rows = self._sort_rows(rows, operation)
+            elif operation.type == "index":
+                rows = self._index_rows(rows, operation)
+            elif operation.type == "group_by":
+                return GroupedDataSheet(
+                    OrderedDict(self._group_rows(rows, operation)), row_model
+                )
+            elif operation.type == "join":
+                other_sheet_name, join_sheet_names = (
+                    join_sheet_names[0],
+                    join_sheet_names[1:],
+                )
+                # The sheet joined with usually has a different model, so it has
+                # to be declared with its own model rather than parsed with the
+                # model of the joined rows.
+                if other_sheet_name not in self.data_sheet_scope:
+                    LOGGER.critical(
+                        f'Cannot join data sheet "{other_sheet_name}": it has to be '
+                        "defined by a data_sheet row before it is joined with."
+                    )
+                other_data_sheet = self._resolve_data_sheet(
+                    self.data_sheet_scope[other_sheet_name]
                 )
-        return DataSheet(new_row_data, data_sheet.row_model)
+                self._check_not_grouped(other_data_sheet, other_sheet_name, "joined")
+                rows, row_model = self._join_rows(
+                    rows, row_model, other_sheet_name, other_data_sheet, operation
+                )
+        return DataSheet(self._make_rows(rows, row_model), row_model)
+
+    def _filter_rows(self, rows, operation):
+        for row_id, row in rows:
+            if self._evaluate_filter(operation.expression, dict(row)):
+                yield row_id, row
 
-    def _data_sheets_sort(self, sheet_name, data_model_name, operation):
-        data_sheet = self._get_data_sheet(sheet_name, data_model_name)
+    def _sort_rows(self, rows, operation):
+        if operation.by:
+            return self._sort_rows_by_keys(rows, operation)
         reverse = True if operation.order.lower() == "descending" else False
         try:
-            new_row_data_list = sorted(
-                data_sheet.rows.items(),
-                key=lambda kvpair: eval(operation.expression, {}, dict(kvpair[1])),
+            return sorted(
+                rows,
+                key=lambda kvpair: evaluate_expression(
+                    operation.expression, dict(kvpair[1])
+                ),
                 reverse=reverse,
             )
         except NameError as e:
@@ -303,16 +683,97 @@ class ContentIndexParser:
                 f"SyntaxError at line {e.lineno} character {e.offset}"
             )
 
-        new_row_data = OrderedDict()
-        for k, v in new_row_data_list:
-            new_row_data[k] = v
-        return DataSheet(new_row_data, data_sheet.row_model)
+    def _sort_rows_by_keys(self, rows, operation):
+        # Sorting is stable, so sorting by each key in turn, starting with the
+        # least significant one, gives the order by all keys, while allowing
+        # a different direction for each key.
+        if operation.expression:
+            LOGGER.critical(
+                "Sort operations may either have an expression or sort keys, "
+                "but not both."
+            )
+        try:
+            sort_keys = SortKey.parse_keys(operation.by, operation.order)
+        except ValueError as e:
+            LOGGER.critical(str(e))
+        rows = list(rows)
+        for sort_key in reversed(sort_keys):
+            try:
+                rows.sort(
+                    key=lambda kvpair: sort_key(kvpair[1]), reverse=sort_key.reverse
+                )
+            except AttributeError as e:
+                LOGGER.critical(f'Invalid sort key "{sort_key.name}": {e}')
+            except (TypeError, ValueError) as e:
+                LOGGER.critical(f'Cannot sort by "{sort_key.name}": {e}')
+        return rows
+
+    def _index_rows(self, rows, operation):
+        # The rows are keyed by the value of the expression rather than by their ID.
+        keys = set()
+        for row_id, row in rows:
+            key = self._evaluate_key(operation.expression, row, "indexing")
+            if key is None:
+                continue
+            if key in keys:
+                LOGGER.critical(f'Duplicate key "{key}" in index')
+            keys.add(key)
+            yield key, row
+
+    def _group_rows(self, rows, operation):
+        # The rows are replaced by lists of all rows with the same value of the
+        # expression, keyed by that value.
+        groups = OrderedDict()
+        for row_id, row in rows:
+            key = self._evaluate_key(operation.expression, row, "grouping")
+            if key is not None:
+                groups.setdefault(key, []).append(row)
+        return groups.items()
+
+    def _join_rows(
+        self, rows, row_model, other_sheet_name, other_data_sheet, operation
+    ):
+        # Each row is joined with the row of the other sheet whose ID is the value
+        # of the expression for the row. The row of the other sheet is added to
+        # the row as a field named after the other sheet. Rows without a matching
+        # row in the other sheet are dropped.
+        if (
+            not other_sheet_name.isidentifier()
+            or other_sheet_name in row_model.__fields__
+        ):
+            LOGGER.critical(
+                f'Cannot join data sheet "{other_sheet_name}": its name must be '
+                "a valid identifier that is not a field of the joined rows."
+            )
+        joined_row_model = create_model(
+            row_model.__name__,
+            __base__=row_model,
+            **{other_sheet_name: (Optional[other_data_sheet.row_model], None)},
+        )
+
+        def join(rows):
+            for row_id, row in rows:
+                key = self._evaluate_key(operation.expression, row, "joining")
+                other_row = None if key is None else other_data_sheet.rows.get(key)
+                if other_row is not None:
+                    yield row_id, joined_row_model.construct(
+                        _fields_set=row.__fields_set__ | {other_sheet_name},
+                        **dict(row),
+                        **{other_sheet_name: other_row},
+                    )
+
+        return join(rows), joined_row_model
 
     def get_data_sheet_row(self, sheet_name, row_id):
-        return self.data_sheets[sheet_name].rows[row_id]
+        return self._get_ungrouped_rows(sheet_name, "used with a data_row_id")[row_id]
 
     def get_data_sheet_rows(self, sheet_name):
-        return self.data_sheets[sheet_name].rows
+        return self._resolve_data_sheet(self.data_sheets[sheet_name]).rows
+
+    def _get_ungrouped_rows(self, sheet_name, usage):
+        data_sheet = self._resolve_data_sheet(self.data_sheets[sheet_name])
+        self._check_not_grouped(data_sheet, sheet_name, usage)
+        return data_sheet.rows
 
     def get_template_sheet(self, name):
         return self.template_sheets[name]
@@ -321,15 +782,35 @@ class ContentIndexParser:
         self, template_name, data_sheet, data_row_id, template_arguments
     ):
         if (data_sheet and data_row_id) or (not data_sheet and not data_row_id):
-            with logging_context(f"{template_name}"):
-                return self._parse_flow(
-                    template_name,
-                    data_sheet,
-                    data_row_id,
-                    template_arguments,
-                    RapidProContainer(),
-                    parse_as_block=True,
-                )
+            # Blocks only depend on these parameters, so the same block is only
+            # parsed once, and further instances are clones with fresh UUIDs.
+            key = (
+                template_name,
+                data_sheet,
+                data_row_id,
+                _freeze(template_arguments),
+            )
+            if key in self.node_group_cache:
+                stats.count("block cache hits")
+            else:
+                # The UUIDs generated while parsing the block don't appear in the
+                # output, as we only output clones. With a separate scope,
+                # deterministic UUIDs of the flow don't depend on which flow
+                # the block is first parsed in.
+                with logging_context(f"{template_name}"), uuid_scope(
+                    f"block:{key}"
+                ), stats.timer("parse blocks"):
+                    self.node_group_cache[key] = self._parse_flow(
+                        template_name,
+                        data_sheet,
+                        data_row_id,
+                        template_arguments,
+                        RapidProContainer(),
+                        parse_as_block=True,
+                    )
+            # The returned node group gets modified when it is inserted,
+            # so we return a copy.
+            return clone_node_group(self.node_group_cache[key])
         else:
             LOGGER.critical(
                 "For insert_as_block, either both data_sheet and data_row_id "
@@ -349,7 +830,9 @@ class ContentIndexParser:
         row_parser = RowParser(CampaignEventRowModel, CellParser())
         sheet_parser = SheetParser(row_parser, sheet.table)
         rows = sheet_parser.parse_all()
-        return CampaignParser(row.new_name or sheet_name, row.group, rows)
+        name = row.new_name or sheet_name
+        with uuid_scope(f"campaign:{name}"):
+            return CampaignParser(name, row.group, rows)
 
     def create_trigger_parser(self, row):
         sheet_name = row.sheet_name[0]
@@ -362,14 +845,18 @@ class ContentIndexParser:
     def parse_all_campaigns(self, rapidpro_container):
         for logging_prefix, campaign_parser in self.campaign_parsers.values():
             sheet_name = campaign_parser.campaign.name
-            with logging_context(f"{logging_prefix} | {sheet_name}"):
+            with error_boundary(), logging_context(
+                "{} | {}", logging_prefix, sheet_name
+            ), uuid_scope(f"campaign events:{sheet_name}"):
                 campaign = campaign_parser.parse()
                 rapidpro_container.add_campaign(campaign)
 
     def parse_all_triggers(self, rapidpro_container):
         for logging_prefix, trigger_parser in self.trigger_parsers:
             sheet_name = trigger_parser.sheet_name
-            with logging_context(f"{logging_prefix} | {sheet_name}"):
+            with error_boundary(), logging_context(
+                "{} | {}", logging_prefix, sheet_name
+            ):
                 triggers = trigger_parser.parse()
                 for trigger in triggers:
                     rapidpro_container.add_trigger(trigger)
@@ -377,11 +864,18 @@ class ContentIndexParser:
     def parse_all_flows(self, rapidpro_container):
         flows = {}
         for logging_prefix, row in self.flow_definition_rows:
-            with logging_context(f"{logging_prefix} | {row.sheet_name[0]}"):
+            with error_boundary(), logging_context(
+                "{} | {}", logging_prefix, row.sheet_name[0]
+            ):
                 if row.data_sheet and not row.data_row_id:
-                    data_rows = self.get_data_sheet_rows(row.data_sheet)
+                    data_rows = self._get_ungrouped_rows(
+                        row.data_sheet, "used to create a flow for each row"
+                    )
                     for data_row_id in data_rows.keys():
-                        with logging_context(f'with data_row_id "{data_row_id}"'):
+                        # Each flow is skipped separately in keep-going mode
+                        with error_boundary(), logging_context(
+                            'with data_row_id "{}"', data_row_id
+                        ):
                             flow = self._parse_flow(
                                 row.sheet_name[0],
                                 row.data_sheet,
@@ -432,7 +926,8 @@ class ContentIndexParser:
         base_name = new_name or sheet_name
         if data_sheet and data_row_id:
             flow_name = " - ".join([base_name, data_row_id])
-            context = self.get_data_sheet_row(data_sheet, data_row_id)
+            # Shallow conversion of the row model into a dict of its fields
+            context = dict(self.get_data_sheet_row(data_sheet, data_row_id))
         else:
             if data_sheet or data_row_id:
                 LOGGER.warn(
@@ -444,7 +939,8 @@ class ContentIndexParser:
         template_sheet = self.get_template_sheet(sheet_name)
         template_table = template_sheet.table
         template_argument_definitions = template_sheet.argument_definitions
-        context = dict(context)
+        # Template arguments are added in a layer on top of the (shared) row data
+        context = ChainMap({}, context)
         self.map_template_arguments_to_context(
             template_argument_definitions, template_arguments, context
         )
@@ -458,7 +954,9 @@ class ContentIndexParser:
         if parse_as_block:
             return flow_parser.parse_as_block()
         else:
-            return flow_parser.parse(add_to_container=False)
+            with uuid_scope(f"flow:{flow_name}"), stats.timer("parse flows"):
+                with stats.timer(f"parse flow ({flow_name})"):
+                    return flow_parser.parse(add_to_container=False)
 
     def map_template_arguments_to_context(self, arg_defs, args, context):
         # Template arguments are positional arguments.
@@ -480,7 +978,7 @@ class ContentIndexParser:
             if arg_def.name in context:
                 LOGGER.critical(
                     f'Template argument "{arg_def.name}" doubly defined '
-                    f'in context: "{context}"'
+                    f'in context: "{dict(context)}"'
                 )
             arg_value = arg if arg != "" else arg_def.default_value
             if arg_value == "":
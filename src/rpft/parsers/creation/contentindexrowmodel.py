@@ -13,6 +13,11 @@ class Operation(ParserModel):
     type: str = ""
     expression: str = ""
     order: str = ""
+    # Sort keys, as an alternative to expression for sort operations.
+    # Comma-separated list of fields (or dotted paths), each optionally followed
+    # by :numeric or :str and by ascending or descending,
+    # e.g. "priority:numeric descending, name"
+    by: str = ""
 
 
 class ContentIndexRowModel(ParserModel):
@@ -24,6 +29,7 @@ class ContentIndexRowModel(ParserModel):
     template_argument_definitions: List[TemplateArgument] = []  # internal name
     template_arguments: list = []
     operation: Operation = Operation()
+    operations: List[Operation] = []
     data_model: str = ""
     group: str = ""
     status: str = ""
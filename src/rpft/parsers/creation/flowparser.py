@@ -1,3 +1,4 @@
+import copy
 from collections import defaultdict
 
 from rpft.logger.logger import get_logger, logging_context
@@ -12,6 +13,7 @@ from rpft.parsers.creation.flowrowmodel import (
     convert_webhook_headers,
 )
 from rpft.rapidpro.models.actions import (
+    Action,
     AddContactGroupAction,
     Group,
     RemoveContactGroupAction,
@@ -21,20 +23,74 @@ from rpft.rapidpro.models.actions import (
     SetRunResultAction,
     WhatsAppMessageTemplating,
 )
+from rpft.rapidpro.models.common import Exit
 from rpft.rapidpro.models.containers import FlowContainer
 from rpft.rapidpro.models.exceptions import RapidProActionError
 from rpft.rapidpro.models.nodes import (
+    BaseNode,
     BasicNode,
     CallWebhookNode,
     EnterFlowNode,
     RandomRouterNode,
     SwitchRouterNode,
     )
-from rpft.rapidpro.models.routers import SwitchRouter
+from rpft.rapidpro.models.routers import RouterCase, RouterCategory, SwitchRouter
+from rpft.rapidpro.utils import generate_new_uuid
 
 LOGGER = get_logger()
 
 
+def clone_node_group(node_group):
+    """
+    Create a deep copy of a node group in which all nodes, exits, categories,
+    cases and actions have fresh UUIDs. References between these (destinations
+    of exits, categories of cases) are updated accordingly. Global UUIDs
+    (of groups and flows) are kept.
+    """
+    clone = copy.deepcopy(node_group)
+    objects = list(_iter_objects(clone))
+    new_uuids = {}
+    for obj in objects:
+        if isinstance(
+            obj,
+            (
+                Action,
+                BaseNode,
+                Exit,
+                RouterCase,
+                RouterCategory,
+                WhatsAppMessageTemplating,
+            ),
+        ):
+            new_uuids[obj.uuid] = generate_new_uuid()
+            obj.uuid = new_uuids[obj.uuid]
+    for obj in objects:
+        if isinstance(obj, Exit) and obj.destination_uuid in new_uuids:
+            obj.destination_uuid = new_uuids[obj.destination_uuid]
+        elif isinstance(obj, RouterCase) and obj.category_uuid in new_uuids:
+            obj.category_uuid = new_uuids[obj.category_uuid]
+    return clone
+
+
+def _iter_objects(root):
+    # Yield all objects (other than containers and primitive values)
+    # reachable from root via attributes and containers, in a fixed order.
+    seen = set()
+    stack = [root]
+    while stack:
+        obj = stack.pop()
+        if obj is None or isinstance(obj, (str, int, float)) or id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, dict):
+            stack.extend(reversed(list(obj.values())))
+        elif isinstance(obj, (list, tuple, set)):
+            stack.extend(reversed(list(obj)))
+        else:
+            yield obj
+            stack.extend(reversed(list(getattr(obj, "__dict__", {}).values())))
+
+
 class NodeGroup:
     # NodeGroups may have multiple exit nodes.
     # add_exit connects ALL of them, except for those
@@ -379,7 +435,7 @@ class FlowParser:
                     if len(row.loop_variable) >= 1 and row.loop_variable[0]:
                         iteration_variable = row.loop_variable[0]
                     else:
-                        with logging_context(f"row {row_idx}"):
+                        with logging_context("row {}", row_idx):
                             LOGGER.critical("begin_for must have a loop_variable")
                     index_variable = None
                     if len(row.loop_variable) >= 2 and row.loop_variable[1]:
@@ -412,7 +468,7 @@ class FlowParser:
                     self.node_group_stack.pop()
                     self.append_node_group(new_node_group, row.row_id)
                 else:
-                    with logging_context(f"row {row_idx}"):
+                    with logging_context("row {}", row_idx):
                         self._parse_row(row)
             row, row_idx = self.sheet_parser.parse_next_row(
                 omit_templating=omit_content, return_index=True
@@ -12,7 +12,7 @@ class TriggerParser:
     def parse(self):
         triggers = []
         for row_idx, row in enumerate(self.rows):
-            with logging_context(f"row {row_idx+2}"):
+            with logging_context("row {}", row_idx + 2):
                 try:
                     trigger = Trigger(
                         row.type,
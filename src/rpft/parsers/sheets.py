@@ -5,11 +5,6 @@ from pathlib import Path
 from typing import List, Mapping
 
 import tablib
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google.oauth2.service_account import Credentials as ServiceAccountCredentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 
 
 class SheetReaderError(Exception):
@@ -94,6 +89,10 @@ class GoogleSheetReader(AbstractSheetReader):
             https://docs.google.com/spreadsheets/d/[spreadsheet_id]/edit
         """
 
+        # The Google API libraries are slow to import, so they are only imported
+        # when Google Sheets are actually read.
+        from googleapiclient.discovery import build
+
         self.name = spreadsheet_id
 
         service = build("sheets", "v4", credentials=self.get_credentials())
@@ -144,6 +143,13 @@ class GoogleSheetReader(AbstractSheetReader):
         )
 
     def get_credentials(self):
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+        from google.oauth2.service_account import (
+            Credentials as ServiceAccountCredentials,
+        )
+        from google_auth_oauthlib.flow import InstalledAppFlow
+
         sa_creds = os.getenv("CREDENTIALS")
         if sa_creds:
             return ServiceAccountCredentials.from_service_account_info(
@@ -4,6 +4,7 @@ from rpft.rapidpro.models.common import (
     ContactFieldReference,
     FlowReference,
     Group,
+    Tracked,
     mangle_string,
 )
 from rpft.rapidpro.models.exceptions import RapidProActionError
@@ -19,7 +20,7 @@ from rpft.rapidpro.utils import generate_new_uuid
 # - No action, split by random
 
 
-class Action:
+class Action(Tracked):
     def from_dict(data):
         # Create a generic Action, and cast it to the specific Action subclass
         # in order to bypass the constructor of the subclass
@@ -42,11 +43,10 @@ class Action:
         self.uuid = generate_new_uuid()
         self.type = type
 
-    def record_global_uuids(self, uuid_dict):
-        pass
-
-    def assign_global_uuids(self, uuid_dict):
-        pass
+    def get_global_references(self):
+        # References to groups/flows whose UUIDs are resolved globally
+        # (see RapidProContainer.update_global_uuids)
+        return []
 
     def render(self):
         return {
@@ -70,13 +70,14 @@ class Action:
 
 class UnclassifiedAction(Action):
     def render(self):
-        return self.__dict__
+        # Leave out the attributes used for tracking (see Tracked)
+        return {k: v for k, v in self.__dict__.items() if not k.startswith("_")}
 
     def get_row_model_fields(self):
         return NotImplementedError
 
 
-class WhatsAppMessageTemplating:
+class WhatsAppMessageTemplating(Tracked):
     def __init__(self, name, template_uuid, variables, uuid=None):
         self.name = name
         self.uuid = uuid or generate_new_uuid()
@@ -141,9 +142,11 @@ class SendMessageAction(Action):
 
     def add_attachment(self, attachment):
         self.attachments.append(attachment)
+        self.invalidate()
 
     def add_quick_reply(self, quick_reply):
         self.quick_replies.append(quick_reply)
+        self.invalidate()
 
     def main_value(self):
         return self.text
@@ -298,13 +301,8 @@ class GenericGroupAction(Action):
         data["groups"] = groups
         super()._assign_fields_from_dict(data)
 
-    def record_global_uuids(self, uuid_dict):
-        for group in self.groups:
-            group.record_uuid(uuid_dict)
-
-    def assign_global_uuids(self, uuid_dict):
-        for group in self.groups:
-            group.assign_uuid(uuid_dict)
+    def get_global_references(self):
+        return list(self.groups)
 
     def main_value(self):
         return self.groups[0].name
@@ -327,6 +325,7 @@ class AddContactGroupAction(GenericGroupAction):
 
     def add_group(self, group):
         self.groups.append(group)
+        self.invalidate()
 
     def render(self):
         return {
@@ -425,11 +424,8 @@ class EnterFlowAction(Action):
         data["flow"] = FlowReference.from_dict(data["flow"])
         super()._assign_fields_from_dict(data)
 
-    def record_global_uuids(self, uuid_dict):
-        self.flow.record_uuid(uuid_dict)
-
-    def assign_global_uuids(self, uuid_dict):
-        self.flow.assign_uuid(uuid_dict)
+    def get_global_references(self):
+        return [self.flow]
 
     def main_value(self):
         return self.flow.name
@@ -52,13 +52,8 @@ class CampaignEvent:
             data_copy["flow"] = FlowReference(**data_copy["flow"])
         return CampaignEvent(**data_copy)
 
-    def record_global_uuids(self, uuid_dict):
-        if self.flow is not None:
-            self.flow.record_uuid(uuid_dict)
-
-    def assign_global_uuids(self, uuid_dict):
-        if self.flow is not None:
-            self.flow.assign_uuid(uuid_dict)
+    def get_global_references(self):
+        return [] if self.flow is None else [self.flow]
 
     def render(self):
         render_dict = {
@@ -101,15 +96,11 @@ class Campaign:
             events=[CampaignEvent.from_dict(event) for event in data["events"]],
         )
 
-    def record_global_uuids(self, uuid_dict):
-        for event in self.events:
-            event.record_global_uuids(uuid_dict)
-        self.group.record_uuid(uuid_dict)
-
-    def assign_global_uuids(self, uuid_dict):
+    def get_global_references(self):
+        references = []
         for event in self.events:
-            event.assign_global_uuids(uuid_dict)
-        self.group.assign_uuid(uuid_dict)
+            references += event.get_global_references()
+        return references + [self.group]
 
     def render(self):
         return {
@@ -4,13 +4,65 @@ from rpft.rapidpro.models.exceptions import RapidProActionError
 from rpft.rapidpro.utils import generate_new_uuid
 
 
+MISSING = object()
+
+# Attributes of nodes caching data derived from the node and its parts
+CACHES = ("_rendered", "_references")
+# Attributes of objects whose modifications may have to invalidate caches
+TRACKING_STATE = frozenset(("_owners",) + CACHES)
+
+
+class Tracked:
+    """
+    Part of a node whose modifications invalidate the cached render output and
+    global references of the nodes it belongs to (see BaseNode.render_cached and
+    BaseNode.get_global_references_cached).
+
+    Attribute assignments are tracked automatically, methods modifying an
+    attribute in place (e.g. appending to a list) have to call invalidate().
+    """
+
+    # The caches that modifications invalidate
+    invalidates = CACHES
+
+    def __setattr__(self, name, value):
+        state = self.__dict__
+        # Objects without caches or owners (e.g. while they are constructed) have
+        # nothing to invalidate, which is checked first as it is the common case.
+        if (
+            not state.keys().isdisjoint(TRACKING_STATE)
+            and state.get(name, MISSING) is not value
+        ):
+            self.invalidate()
+        object.__setattr__(self, name, value)
+
+    def __getstate__(self):
+        # Copies (e.g. of blocks) don't belong to the nodes of the original
+        state = self.__dict__.copy()
+        state.pop("_owners", None)
+        for cache in CACHES:
+            state.pop(cache, None)
+        return state
+
+    def invalidate(self, caches=None):
+        caches = caches or self.invalidates
+        for cache in caches:
+            self.__dict__.pop(cache, None)
+        for owner in self.__dict__.get("_owners", {}).values():
+            for cache in caches:
+                owner.__dict__.pop(cache, None)
+
+    def add_owner(self, owner):
+        self.__dict__.setdefault("_owners", {})[id(owner)] = owner
+
+
 def mangle_string(string):
     string = re.sub(r"[. ]", "_", string)
     string = re.sub(r"[^A-Za-z0-9\_\-]+", "", string)
     return string[:15]
 
 
-class Exit:
+class Exit(Tracked):
     def __init__(self, destination_uuid=None, uuid=None):
         self.uuid = uuid if uuid else generate_new_uuid()
         self.destination_uuid = destination_uuid
@@ -38,7 +90,10 @@ class Exit:
         }
 
 
-class FlowReference:
+class FlowReference(Tracked):
+    # Assigning its UUID doesn't change the references of the nodes
+    invalidates = ("_rendered",)
+
     def from_dict(data):
         return FlowReference(**data)
 
@@ -69,7 +124,7 @@ def generate_field_key(field_name):
     return field_key
 
 
-class ContactFieldReference:
+class ContactFieldReference(Tracked):
     def from_dict(data):
         return ContactFieldReference(**data)
 
@@ -88,7 +143,10 @@ class ContactFieldReference:
         return {"label": self.name, "key": self.key}
 
 
-class Group:
+class Group(Tracked):
+    # Assigning its UUID doesn't change the references of the nodes
+    invalidates = ("_rendered",)
+
     def from_dict(data):
         return Group(**data)
 
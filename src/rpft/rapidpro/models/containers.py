@@ -8,7 +8,8 @@ from rpft.rapidpro.models.actions import Group
 from rpft.rapidpro.models.campaigns import Campaign
 from rpft.rapidpro.models.nodes import BaseNode
 from rpft.rapidpro.models.triggers import Trigger
-from rpft.rapidpro.utils import generate_new_uuid
+from rpft.rapidpro.utils import generate_new_uuid, uuid_scope
+from rpft.stats import stats
 
 
 class RapidProContainer:
@@ -65,26 +66,32 @@ class RapidProContainer:
         self.uuid_dict.record_flow_uuid(name, uuid)
 
     def update_global_uuids(self):
-        # Prefill with existings flows and groups
-        for group in self.groups:
-            self.uuid_dict.record_group_uuid(group.name, group.uuid)
-        for flow in self.flows:
-            self.uuid_dict.record_flow_uuid(flow.name, flow.uuid)
-
-        # Update group/flow UUIDs referenced within the flows
-        for flow in self.flows:
-            flow.record_global_uuids(self.uuid_dict)
-        for campaign in self.campaigns:
-            campaign.record_global_uuids(self.uuid_dict)
-        for trigger in self.triggers:
-            trigger.record_global_uuids(self.uuid_dict, require_existing=True)
-        self.uuid_dict.generate_missing_uuids()
-        for flow in self.flows:
-            flow.assign_global_uuids(self.uuid_dict)
-        for campaign in self.campaigns:
-            campaign.assign_global_uuids(self.uuid_dict)
-        for trigger in self.triggers:
-            trigger.assign_global_uuids(self.uuid_dict)
+        with stats.timer("update global UUIDs"):
+            # Prefill with existings flows and groups
+            for group in self.groups:
+                self.uuid_dict.record_group_uuid(group.name, group.uuid)
+            for flow in self.flows:
+                self.uuid_dict.record_flow_uuid(flow.name, flow.uuid)
+
+            # Update group/flow UUIDs referenced within the flows. The references
+            # of each node are cached until the node is modified (see
+            # BaseNode.get_global_references_cached), so re-rendering doesn't
+            # walk the nodes again. Campaigns and triggers are small, so their
+            # references are collected each time.
+            references = []
+            for item in self.flows + self.campaigns:
+                references += item.get_global_references()
+            for reference in references:
+                reference.record_uuid(self.uuid_dict)
+            for trigger in self.triggers:
+                trigger.check_flow_exists(self.uuid_dict)
+                trigger_references = trigger.get_global_references()
+                for reference in trigger_references:
+                    reference.record_uuid(self.uuid_dict)
+                references += trigger_references
+            self.uuid_dict.generate_missing_uuids()
+            for reference in references:
+                reference.assign_uuid(self.uuid_dict)
 
     def merge(self, container):
         """Merge another RapidPro container into this one.
@@ -158,22 +165,23 @@ class FlowContainer:
 
     def add_node(self, node):
         self.nodes.append(node)
+        stats.count("nodes created")
 
-    def record_global_uuids(self, uuid_dict):
-        for node in self.nodes:
-            node.record_global_uuids(uuid_dict)
-
-    def assign_global_uuids(self, uuid_dict):
-        for node in self.nodes:
-            node.assign_global_uuids(uuid_dict)
+    def get_global_references(self):
+        return [
+            reference
+            for node in self.nodes
+            for reference in node.get_global_references_cached()
+        ]
 
     def render(self):
+        rendered_nodes = [node.render_cached() for node in self.nodes]
         render_dict = {
             "uuid": self.uuid,
             "name": self.name,
             "language": self.language,
             "type": self.type,
-            "nodes": [node.render() for node in self.nodes],
+            "nodes": [node_dict for node_dict, _ in rendered_nodes],
             "spec_version": self.spec_version,
             "revision": self.revision,
             "expire_after_minutes": self.expire_after_minutes,
@@ -181,8 +189,7 @@ class FlowContainer:
             "localization": self.localization,
         }
         ui_dict = {}
-        for node in self.nodes:
-            node_ui = node.render_ui()
+        for node, (_, node_ui) in zip(self.nodes, rendered_nodes):
             if node_ui:
                 ui_dict[node.uuid] = node_ui
         if ui_dict:
@@ -311,10 +318,12 @@ class UUIDDict:
     def generate_missing_uuids(self):
         for k, v in self.flow_dict.items():
             if not v:
-                self.flow_dict[k] = generate_new_uuid()
+                with uuid_scope(f"flow uuid:{k}"):
+                    self.flow_dict[k] = generate_new_uuid()
         for k, v in self.group_dict.items():
             if not v:
-                self.group_dict[k] = generate_new_uuid()
+                with uuid_scope(f"group uuid:{k}"):
+                    self.group_dict[k] = generate_new_uuid()
 
     def record_group_uuid(self, name, uuid):
         self._record_uuid(self.group_dict, name, uuid)
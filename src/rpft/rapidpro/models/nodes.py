@@ -1,3 +1,4 @@
+import marshal
 import re
 from abc import ABC, abstractmethod
 
@@ -8,7 +9,7 @@ from rpft.parsers.creation.flowrowmodel import (
     unconvert_webhook_headers,
 )
 from rpft.rapidpro.models.actions import Action, EnterFlowAction
-from rpft.rapidpro.models.common import Exit, mangle_string
+from rpft.rapidpro.models.common import Exit, Tracked, mangle_string
 from rpft.rapidpro.models.routers import RandomRouter, SwitchRouter
 from rpft.rapidpro.utils import generate_new_uuid
 
@@ -24,7 +25,25 @@ from rpft.rapidpro.utils import generate_new_uuid
 # TODO: Make BaseNode an abstract class
 
 
-class BaseNode(ABC):
+def _iter_parts(node):
+    # Yield all Tracked objects reachable from the node via attributes and containers
+    seen = {id(node)}
+    stack = [value for key, value in node.__dict__.items() if key[0] != "_"]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, dict):
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple)):
+            stack.extend(obj)
+        elif isinstance(obj, Tracked):
+            yield obj
+            stack.extend(value for key, value in obj.__dict__.items() if key[0] != "_")
+
+
+class BaseNode(Tracked, ABC):
     def __init__(
         self,
         uuid=None,
@@ -79,17 +98,30 @@ class BaseNode(ABC):
 
     def _add_exit(self, exit):
         self.exits.append(exit)
+        self.invalidate()
 
     def add_action(self, action):
         self.actions.append(action)
+        self.invalidate()
 
-    def record_global_uuids(self, uuid_dict):
-        for action in self.actions:
-            action.record_global_uuids(uuid_dict)
+    def get_global_references(self):
+        return [
+            reference
+            for action in self.actions
+            for reference in action.get_global_references()
+        ]
 
-    def assign_global_uuids(self, uuid_dict):
-        for action in self.actions:
-            action.assign_global_uuids(uuid_dict)
+    def get_global_references_cached(self):
+        """
+        Return the output of get_global_references(), which is cached until the
+        node or one of its parts is modified.
+        """
+        references = self.__dict__.get("_references")
+        if references is None:
+            references = self.get_global_references()
+            self.__dict__["_references"] = references
+            self._register_parts()
+        return references
 
     def add_choice(self):
         raise NotImplementedError
@@ -106,6 +138,33 @@ class BaseNode(ABC):
     def get_exits(self):
         return self.exits
 
+    def render_cached(self):
+        """
+        Return the output of render() and render_ui(), which is cached until the
+        node or one of its parts is modified.
+
+        The output is cached in serialized form, so that each call returns new
+        dicts, which callers may modify. Deserializing them is several times
+        faster than rendering again.
+        """
+        rendered = self.__dict__.get("_rendered")
+        if rendered is not None:
+            return marshal.loads(rendered)
+        output = (self.render(), self.render_ui())
+        try:
+            self.__dict__["_rendered"] = marshal.dumps(output)
+        except ValueError:
+            # The output contains objects that cannot be serialized, so it is
+            # rendered again each time.
+            return output
+        self._register_parts()
+        return output
+
+    def _register_parts(self):
+        # Modifying any part of the node invalidates its caches
+        for part in _iter_parts(self):
+            part.add_owner(self)
+
     def render(self):
         self.validate()
         # recursively render the elements of the node
@@ -259,13 +318,8 @@ class SwitchRouterNode(BaseNode):
     def has_positive_wait(self):
         return self.router.has_positive_wait()
 
-    def record_global_uuids(self, uuid_dict):
-        super().record_global_uuids(uuid_dict)
-        self.router.record_global_uuids(uuid_dict)
-
-    def assign_global_uuids(self, uuid_dict):
-        super().assign_global_uuids(uuid_dict)
-        self.router.assign_global_uuids(uuid_dict)
+    def get_global_references(self):
+        return super().get_global_references() + self.router.get_global_references()
 
     def validate(self):
         if self.has_basic_exit:
@@ -1,13 +1,13 @@
 import logging
 
-from rpft.rapidpro.models.common import Exit
+from rpft.rapidpro.models.common import Exit, Tracked
 from rpft.rapidpro.utils import generate_new_uuid
 from rpft.parsers.creation.flowrowmodel import Condition, Edge
 
 logger = logging.getLogger(__name__)
 
 
-class BaseRouter:
+class BaseRouter(Tracked):
     def __init__(self, result_name=None, categories=None):
         self.type = None
         self.categories = categories or []
@@ -52,6 +52,7 @@ class BaseRouter:
     def _add_category(self, category_name, destination_uuid):
         category = RouterCategory(category_name, destination_uuid)
         self.categories.append(category)
+        self.invalidate()
         return self.categories[-1]
 
     def get_or_create_category(self, category_name, destination_uuid):
@@ -186,6 +187,7 @@ class SwitchRouter(BaseRouter):
     def _add_case(self, comparison_type, arguments, category_uuid):
         case = RouterCase(comparison_type, arguments, category_uuid)
         self.cases.append(case)
+        self.invalidate()
         return self.cases[-1]
 
     def create_case(self, comparison_type, arguments, category):
@@ -271,15 +273,10 @@ class SwitchRouter(BaseRouter):
 
         self.operand = operand
 
-    def record_global_uuids(self, uuid_dict):
-        for case in self.cases:
-            if case.type == "has_group":
-                uuid_dict.record_group_uuid(case.arguments[1], case.arguments[0])
-
-    def assign_global_uuids(self, uuid_dict):
-        for case in self.cases:
-            if case.type == "has_group":
-                case.arguments[0] = uuid_dict.get_group_uuid(case.arguments[1])
+    def get_global_references(self):
+        return [
+            GroupCaseReference(case) for case in self.cases if case.type == "has_group"
+        ]
 
     def validate(self):
         # TODO: Add more validation
@@ -409,7 +406,7 @@ class RandomRouter(BaseRouter):
         return pairs
 
 
-class RouterCategory:
+class RouterCategory(Tracked):
     def __init__(
         self, name, destination_uuid=None, uuid=None, exit_uuid=None, exit=None
     ):
@@ -458,7 +455,24 @@ class RouterCategory:
         }
 
 
-class RouterCase:
+class GroupCaseReference:
+    """Reference to the group of a has_group case, whose arguments are [uuid, name]"""
+
+    def __init__(self, case):
+        self.case = case
+
+    def record_uuid(self, uuid_dict):
+        uuid_dict.record_group_uuid(self.case.arguments[1], self.case.arguments[0])
+
+    def assign_uuid(self, uuid_dict):
+        uuid = uuid_dict.get_group_uuid(self.case.arguments[1])
+        if self.case.arguments[0] != uuid:
+            self.case.arguments[0] = uuid
+            # This doesn't change the references of the node
+            self.case.invalidate(("_rendered",))
+
+
+class RouterCase(Tracked):
     NO_ARGS_TESTS = {
         "has_date",
         "has_email",
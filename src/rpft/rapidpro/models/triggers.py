@@ -84,30 +84,21 @@ class Trigger:
             data_copy.pop("keyword")
         return Trigger(**data_copy)
 
-    def record_global_uuids(self, uuid_dict, require_existing=False):
-        if require_existing:
-            if not uuid_dict.contains_flow(self.flow.name):
-                raise RapidProTriggerError(
-                    f"Trigger references undefined flow name {self.flow.name}"
-                )
-        if self.flow is not None:
-            self.flow.record_uuid(uuid_dict)
-        if self.groups is not None:
-            for group in self.groups:
-                group.record_uuid(uuid_dict)
-        if self.exclude_groups is not None:
-            for group in self.exclude_groups:
-                group.record_uuid(uuid_dict)
+    def check_flow_exists(self, uuid_dict):
+        if not uuid_dict.contains_flow(self.flow.name):
+            raise RapidProTriggerError(
+                f"Trigger references undefined flow name {self.flow.name}"
+            )
 
-    def assign_global_uuids(self, uuid_dict):
+    def get_global_references(self):
+        references = []
         if self.flow is not None:
-            self.flow.assign_uuid(uuid_dict)
+            references.append(self.flow)
         if self.groups is not None:
-            for group in self.groups:
-                group.assign_uuid(uuid_dict)
+            references += self.groups
         if self.exclude_groups is not None:
-            for group in self.exclude_groups:
-                group.assign_uuid(uuid_dict)
+            references += self.exclude_groups
+        return references
 
     def render(self):
         # We include both keywords and keyword in the render output
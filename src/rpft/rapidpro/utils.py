@@ -1,5 +1,66 @@
 import uuid
+from contextlib import contextmanager
+
+
+class DeterministicUUIDGenerator:
+    def __init__(self, seed):
+        """
+        Generates a reproducible sequence of UUIDs for each scope.
+
+        The UUIDs are derived (via uuid5) from the seed, the name of the
+        current scope and the number of UUIDs generated so far within it.
+        """
+        self.namespace = uuid.uuid5(uuid.NAMESPACE_OID, str(seed))
+        self.scope = ""
+        self.counter = 0
+
+    def generate(self):
+        self.counter += 1
+        return str(uuid.uuid5(self.namespace, f"{self.scope}:{self.counter}"))
+
+
+# If None, random UUIDs are generated
+_uuid_generator = None
 
 
 def generate_new_uuid():
-    return str(uuid.uuid4())
+    if _uuid_generator is None:
+        return str(uuid.uuid4())
+    return _uuid_generator.generate()
+
+
+@contextmanager
+def deterministic_uuids(seed):
+    """
+    Within this context, generate_new_uuid produces UUIDs determined by the
+    seed (see DeterministicUUIDGenerator), so that the same input produces
+    the same output.
+    """
+    global _uuid_generator
+    previous_generator = _uuid_generator
+    _uuid_generator = DeterministicUUIDGenerator(seed)
+    try:
+        yield
+    finally:
+        _uuid_generator = previous_generator
+
+
+@contextmanager
+def uuid_scope(name):
+    """
+    Within this context, deterministic UUIDs are derived from the given scope
+    name, independently of UUIDs generated in other scopes. For example, with a
+    scope per flow, the UUIDs of a flow do not change if other flows change.
+
+    Has no effect unless deterministic_uuids is active.
+    """
+    generator = _uuid_generator
+    if generator is None:
+        yield
+        return
+    previous_state = (generator.scope, generator.counter)
+    generator.scope, generator.counter = name, 0
+    try:
+        yield
+    finally:
+        generator.scope, generator.counter = previous_state
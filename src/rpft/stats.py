@@ -0,0 +1,75 @@
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Stats:
+    def __init__(self):
+        """
+        Wall/CPU timers for processing stages, and counters.
+
+        Nothing is recorded unless enabled is set. Times of a stage include
+        the times of the stages nested within it.
+        """
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        # stage -> [number of calls, wall time, CPU time]
+        self.timers = {}
+        # stage -> number of currently active timers of the stage
+        self.active_stages = defaultdict(int)
+        self.counters = defaultdict(int)
+
+    @contextmanager
+    def timer(self, stage):
+        if not self.enabled:
+            yield
+            return
+        timer = self.timers.setdefault(stage, [0, 0.0, 0.0])
+        timer[0] += 1
+        self.active_stages[stage] += 1
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield
+        finally:
+            self.active_stages[stage] -= 1
+            # For recursive stages (e.g. blocks within blocks), only the
+            # outermost call is timed.
+            if not self.active_stages[stage]:
+                timer[1] += time.perf_counter() - wall_start
+                timer[2] += time.process_time() - cpu_start
+
+    def count(self, counter, n=1):
+        if self.enabled:
+            self.counters[counter] += n
+
+    def to_dict(self):
+        return {
+            "timers": {
+                stage: {"calls": calls, "wall_time": wall, "cpu_time": cpu}
+                for stage, (calls, wall, cpu) in self.timers.items()
+            },
+            "counters": dict(self.counters),
+        }
+
+    def format_table(self):
+        stage_width = max([len(stage) for stage in self.timers] + [5])
+        counter_width = max([len(counter) for counter in self.counters] + [7])
+        lines = [
+            f"{'Stage':<{stage_width}}  {'Calls':>8}  {'Wall (s)':>10}"
+            f"  {'CPU (s)':>10}"
+        ]
+        for stage, (calls, wall, cpu) in self.timers.items():
+            lines.append(
+                f"{stage:<{stage_width}}  {calls:>8}  {wall:>10.3f}  {cpu:>10.3f}"
+            )
+        lines.append("")
+        lines.append(f"{'Counter':<{counter_width}}  {'Count':>10}")
+        for counter, count in self.counters.items():
+            lines.append(f"{counter:<{counter_width}}  {count:>10}")
+        return "\n".join(lines)
+
+
+stats = Stats()
@@ -4,3 +4,9 @@ from rpft.parsers.creation.datarowmodel import DataRowModel
 class SimpleRowModel(DataRowModel):
     value1: str = ""
     value2: str = ""
+
+
+class TypedRowModel(DataRowModel):
+    value1: str = ""
+    value2: str = ""
+    number: int = 0
@@ -41,15 +41,15 @@ class MockSheetParser(SheetParser):
 
         self.row_parser = row_parser
         self.bookmarks = {}
-        self.input_rows = rows
-        self.iterator = iter(self.input_rows)
+        self.rows = rows
+        self.cursor = 0
         self.context = copy.deepcopy(context)
 
     def parse_next_row(self, omit_templating=False, return_index=False):
-        try:
-            input_row = next(self.iterator)
-        except StopIteration:
+        if self.cursor >= len(self.rows):
             return (None, None) if return_index else None
+        input_row = self.rows[self.cursor]
+        self.cursor += 1
         return (input_row, -1) if return_index else None
 
 
@@ -1,7 +1,14 @@
+import itertools
 import unittest
+from collections import ChainMap
 from typing import List
+from unittest.mock import patch
 
-from rpft.parsers.common.cellparser import CellParser
+from rpft.parsers.common.cellparser import (
+    CellParser,
+    compile_expression,
+    evaluate_expression,
+)
 from rpft.parsers.common.rowparser import ParserModel
 
 
@@ -109,11 +116,32 @@ class TestStringSplitter(unittest.TestCase):
         self.compare_split_into_lists(" a\n|\nb ", ["a", "b"])
         self.compare_split_into_lists("1; 2\n|\n3; 4", [["1", "2"], ["3", "4"]])
 
+    def test_split_into_lists_matches_split_by_separator(self):
+        # split_into_lists is a single pass version of split_by_separator
+        # followed by cleanse; check this on all short strings.
+        for length in range(6):
+            for chars in itertools.product("a \\|;", repeat=length):
+                string = "".join(chars)
+                l1 = self.parser.split_by_separator(string, "|")
+                if type(l1) is str:
+                    exp = self.parser.split_by_separator(string, ";")
+                else:
+                    exp = [self.parser.split_by_separator(s, ";") for s in l1]
+                self.compare_split_into_lists(string, self.parser.cleanse(exp))
+
 
 class TestCellParser(unittest.TestCase):
     def setUp(self):
         self.parser = CellParser()
 
+    def test_error_logs_merged_context(self):
+        context = ChainMap({"b": 2}, {"a": 1})
+        with patch("rpft.parsers.common.cellparser.LOGGER") as logger:
+            self.parser.parse_as_string("{{ a|undefined_filter }}", context=context)
+        message = logger.critical.call_args[0][0]
+        self.assertIn("{'a': 1, 'b': 2}", message)
+        self.assertNotIn("ChainMap", message)
+
     def test_parse_as_string(self):
         out = self.parser.parse_as_string("plain string")
         self.assertEqual(out, "plain string")
@@ -151,6 +179,30 @@ class TestCellParser(unittest.TestCase):
         out = self.parser.parse("{{string|escape}}", context={"string": string})
         self.assertEqual(out, string)
 
+    def test_eval_filter(self):
+        out = self.parser.parse_as_string('{{"x + 1"|eval}}', context={"x": 2})
+        self.assertEqual(out, "3")
+        out = self.parser.parse_as_string('{{"x + 1"|eval}}', context={"x": 5})
+        self.assertEqual(out, "6")
+
+    def test_evaluate_expression(self):
+        self.assertEqual(evaluate_expression("a * b", {"a": 2, "b": 3}), 6)
+        self.assertIs(compile_expression("a * b"), compile_expression("a * b"))
+        with self.assertRaises(SyntaxError):
+            evaluate_expression("a *", {"a": 2})
+
+    def test_get_template_variables(self):
+        variables = self.parser.get_template_variables
+        self.assertEqual(variables("plain text|with;lists"), frozenset())
+        self.assertEqual(variables(None), frozenset())
+        self.assertEqual(variables("{{a}} and {{b.field|upper}}"), {"a", "b"})
+        self.assertEqual(
+            variables("{% for x in items %}{{x}}{{y}}{% endfor %}"), {"items", "y"}
+        )
+        self.assertEqual(variables(" {@ (a, [b]) @} "), {"a", "b"})
+        # Variables accessed via eval cannot be determined statically
+        self.assertIsNone(variables('{{"x + 1"|eval}}'))
+
     def test_parse_native_tpye(self):
         out = self.parser.parse_as_string('{@(1,2,[3,"a"])@}')
         self.assertEqual(out, (1, 2, [3, "a"]))
@@ -0,0 +1,42 @@
+import unittest
+
+from rpft.parsers.common.compactrows import CompactRows
+from tests.datarowmodels.simplemodel import TypedRowModel
+
+
+class TestCompactRows(unittest.TestCase):
+    def setUp(self):
+        self.rows = CompactRows(
+            TypedRowModel,
+            [
+                ("a", TypedRowModel(ID="a", value1="x", value2="y", number=1)),
+                ("b", TypedRowModel(ID="b", value1="x", value2="z", number=2)),
+                ("a", TypedRowModel(ID="a", value1="w", value2="y", number=3)),
+            ],
+        )
+
+    def test_mapping(self):
+        # Like a dict, a duplicate ID replaces the row but keeps its position
+        self.assertEqual(list(self.rows), ["a", "b"])
+        self.assertEqual(len(self.rows), 2)
+        self.assertEqual(
+            self.rows["a"], TypedRowModel(ID="a", value1="w", value2="y", number=3)
+        )
+        self.assertEqual(self.rows["b"].number, 2)
+        self.assertIn("b", self.rows)
+        self.assertNotIn("c", self.rows)
+        with self.assertRaises(KeyError):
+            self.rows["c"]
+
+    def test_strings_interned(self):
+        # Build equal strings that are distinct objects
+        values = ["".join(["fr", "uit"]) for _ in range(2)]
+        self.assertIsNot(values[0], values[1])
+        rows = CompactRows(
+            TypedRowModel,
+            [
+                (str(i), TypedRowModel(ID=str(i), value1=value))
+                for i, value in enumerate(values)
+            ],
+        )
+        self.assertIs(rows["0"].value1, rows["1"].value1)
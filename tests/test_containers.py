@@ -1,8 +1,15 @@
+import copy
 import unittest
+from unittest.mock import patch
 
 from rpft.rapidpro.models.containers import RapidProContainer, FlowContainer
 from rpft.rapidpro.models.actions import Group, AddContactGroupAction
-from rpft.rapidpro.models.nodes import BasicNode, SwitchRouterNode, EnterFlowNode
+from rpft.rapidpro.models.nodes import (
+    BaseNode,
+    BasicNode,
+    SwitchRouterNode,
+    EnterFlowNode,
+)
 from rpft.rapidpro.models.campaigns import Campaign, CampaignEvent
 from rpft.rapidpro.models.triggers import Trigger
 
@@ -151,3 +158,65 @@ class TestRapidProContainer(unittest.TestCase):
         )
         self.assertEqual(rpc.flows[0].nodes[1].actions[0].flow.uuid, "fake-flow-uuid")
         self.assertEqual(rpc.triggers[0].flow.uuid, "fake-flow-uuid")
+
+    def test_references_are_cached(self):
+        rpc = RapidProContainer()
+        rpc.add_flow(get_flow_with_group_and_flow_node())
+        rpc.add_flow(get_has_group_flow())
+        with patch.object(
+            BaseNode,
+            "get_global_references",
+            autospec=True,
+            side_effect=BaseNode.get_global_references,
+        ) as collect:
+            first_render = rpc.render()
+            self.assertEqual(collect.call_count, 4)
+            second_render = rpc.render()
+            self.assertEqual(collect.call_count, 4)
+        self.assertEqual(first_render, second_render)
+        self.assertEqual(
+            rpc.flows[1].nodes[0].router.cases[0].arguments[0],
+            rpc.flows[0].nodes[0].actions[0].groups[0].uuid,
+        )
+
+    def test_flow_modified_after_adding(self):
+        rpc = RapidProContainer()
+        flow = FlowContainer("Flow")
+        flow.add_node(BasicNode())
+        rpc.add_flow(flow)
+        node = BasicNode()
+        node.add_action(AddContactGroupAction(groups=[Group("Late Group")]))
+        flow.add_node(node)
+
+        render = rpc.render()
+
+        group_uuid = render["flows"][0]["nodes"][1]["actions"][0]["groups"][0]["uuid"]
+        self.assertIsNotNone(group_uuid)
+        self.assertEqual(render["groups"], [{"name": "Late Group", "uuid": group_uuid}])
+
+    def test_flow_modified_after_rendering(self):
+        rpc = RapidProContainer()
+        rpc.add_flow(get_flow_with_group_and_flow_node())
+        rpc.render()
+        action = rpc.flows[0].nodes[0].actions[0]
+        action.add_group(Group("Late Group"))
+
+        render = rpc.render()
+
+        groups = render["flows"][0]["nodes"][0]["actions"][0]["groups"]
+        self.assertIsNotNone(groups[2]["uuid"])
+        self.assertIn(
+            {"name": "Late Group", "uuid": groups[2]["uuid"]}, render["groups"]
+        )
+
+    def test_render_output_can_be_modified(self):
+        rpc = RapidProContainer()
+        rpc.add_flow(get_flow_with_group_and_flow_node())
+        expected = copy.deepcopy(rpc.render())
+
+        # Modifying the output (e.g. replacing UUIDs) doesn't affect later renders
+        modified = rpc.render()
+        modified["flows"][0]["nodes"][0]["uuid"] = "replaced"
+        modified["flows"][0]["nodes"][0]["actions"][0]["groups"].clear()
+
+        self.assertEqual(rpc.render(), expected)
@@ -1,9 +1,13 @@
 import unittest
+from contextlib import contextmanager
+from unittest.mock import patch
 
+from rpft.logger.logger import ProcessingError, keep_going_mode
 from rpft.parsers.creation.contentindexparser import ContentIndexParser
 from rpft.parsers.creation.tagmatcher import TagMatcher
 from rpft.parsers.sheets import CompositeSheetReader, CSVSheetReader, XLSXSheetReader
 from rpft.rapidpro.models.triggers import RapidProTriggerError
+from rpft.stats import Stats
 from tests import TESTS_ROOT
 from tests.mocks import MockSheetReader
 from tests.utils import Context, traverse_flow
@@ -242,6 +246,42 @@ class TestParsing(TestTemplate):
             render_output, "my_template - row3", ["Value3", "Happy3 and Sad3"]
         )
 
+    def test_flow_timers(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,status\n"
+            "create_flow,my_template,nesteddata,,,,\n"
+            "create_flow,my_basic_flow,,,,,\n"
+            "data_sheet,nesteddata,,,,NestedRowModel,\n"
+        )
+        sheet_dict = {
+            "nesteddata": csv_join(
+                "ID,value1,custom_field.happy,custom_field.sad",
+                "row1,Value1,Happy1,Sad1",
+                "row2,Value2,Happy2,Sad2",
+            ),
+            "my_template": csv_join(
+                "row_id,type,from,message_text",
+                ",send_message,start,{{value1}}",
+            ),
+            "my_basic_flow": csv_join(
+                "row_id,type,from,message_text",
+                ",send_message,start,Some text",
+            ),
+        }
+        stats = Stats()
+        stats.enabled = True
+
+        with patch("rpft.parsers.creation.contentindexparser.stats", stats):
+            ContentIndexParser(
+                MockSheetReader(ci_sheet, sheet_dict),
+                "tests.datarowmodels.nestedmodel",
+            ).parse_all()
+
+        timers = stats.to_dict()["timers"]
+        self.assertEqual(timers["parse flows"]["calls"], 3)
+        for flow_name in ["my_template - row1", "my_template - row2", "my_basic_flow"]:
+            self.assertEqual(timers[f"parse flow ({flow_name})"]["calls"], 1)
+
     def test_duplicate_create_flow(self):
         ci_sheet = (
             "type,sheet_name,data_sheet,data_row_id,new_name,data_model,status\n"
@@ -363,6 +403,68 @@ class TestParsing(TestTemplate):
             Context(inputs=["happy", "else", "sad"]),
         )
 
+    def test_insert_as_block_repeated(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,status\n"
+            "template_definition,my_template,,,,,\n"
+            "create_flow,my_basic_flow,,,,,\n"
+            "data_sheet,nesteddata,,,,NestedRowModel,\n"
+        )
+        nesteddata = (
+            "ID,value1,custom_field.happy,custom_field.sad\n"
+            "row1,Value1,Happy1,Sad1\n"
+        )
+        my_template = (
+            "row_id,type,from,condition,message_text\n"
+            ",send_message,start,,{{value1}}\n"
+            "1,wait_for_response,,,\n"
+            ",send_message,1,happy,I'm {{custom_field.happy}}\n"
+            ",send_message,1,sad,I'm {{custom_field.sad}}\n"
+            ",hard_exit,,,\n"
+        )
+        my_basic_flow = (
+            "row_id,type,from,message_text,data_sheet,data_row_id\n"
+            ",send_message,start,Some text,,\n"
+            ",insert_as_block,,my_template,nesteddata,row1\n"
+            ",send_message,,Next message,,\n"
+            ",insert_as_block,,my_template,nesteddata,row1\n"
+            ",send_message,,Last message,,\n"
+        )
+        sheet_dict = {
+            "nesteddata": nesteddata,
+            "my_template": my_template,
+            "my_basic_flow": my_basic_flow,
+        }
+
+        sheet_reader = MockSheetReader(ci_sheet, sheet_dict)
+        ci_parser = ContentIndexParser(sheet_reader, "tests.datarowmodels.nestedmodel")
+        render_output = ci_parser.parse_all().render()
+        # The block is only parsed once
+        self.assertEqual(len(ci_parser.node_group_cache), 1)
+        self.compare_messages(
+            render_output,
+            "my_basic_flow",
+            ["Some text", "Value1", "I'm Happy1", "Next message", "Value1", "I'm Sad1"],
+            Context(inputs=["happy", "sad"]),
+        )
+        self.compare_messages(
+            render_output,
+            "my_basic_flow",
+            ["Some text", "Value1", "I'm Happy1", "Next message"]
+            + ["Value1", "I'm Happy1", "Last message"],
+            Context(inputs=["happy", "happy"]),
+        )
+        # The second instance of the block has fresh UUIDs
+        uuids = []
+        for node in render_output["flows"][0]["nodes"]:
+            uuids.append(node["uuid"])
+            uuids += [action["uuid"] for action in node["actions"]]
+            uuids += [exit["uuid"] for exit in node["exits"]]
+            if "router" in node:
+                uuids += [c["uuid"] for c in node["router"]["categories"]]
+                uuids += [c["uuid"] for c in node["router"]["cases"]]
+        self.assertEqual(len(uuids), len(set(uuids)))
+
     def test_insert_as_block_with_sheet_arguments(self):
         ci_sheet = (
             "type,sheet_name,data_sheet,data_row_id,template_arguments,new_name,data_model,status\n"  # noqa: E501
@@ -637,6 +739,12 @@ class TestParsing(TestTemplate):
 
 
 class TestOperation(unittest.TestCase):
+    @contextmanager
+    def assertNoCriticalLogs(self):
+        with patch("rpft.parsers.creation.contentindexparser.LOGGER") as logger:
+            yield
+        logger.critical.assert_not_called()
+
     def test_concat(self):
         # Concatenate two fresh sheets
         ci_sheet = (
@@ -743,6 +851,10 @@ class TestOperation(unittest.TestCase):
 
         sheet_reader = MockSheetReader(ci_sheet, sheet_dict)
         ci_parser = ContentIndexParser(sheet_reader, "tests.datarowmodels.simplemodel")
+        compact_parser = ContentIndexParser(
+            sheet_reader, "tests.datarowmodels.simplemodel", compact_data_sheets=True
+        )
+        compact_rows = compact_parser.get_data_sheet_rows("simpledata")
 
         # Ensure input data hasn't been modified
         if original:
@@ -753,6 +865,8 @@ class TestOperation(unittest.TestCase):
         rows = ci_parser.get_data_sheet_rows("simpledata")
         self.assertEqual(len(rows), len(exp_keys))
         self.assertEqual(list(rows.keys()), exp_keys)
+        # Compact data sheets behave the same way
+        self.assertEqual(dict(compact_rows), dict(rows))
         return rows
 
     def test_filter_fresh2(self):
@@ -801,6 +915,315 @@ class TestOperation(unittest.TestCase):
         exp_keys = ["rowB", "rowA", "rowD", "rowC"]
         self.check_filtersort(ci_sheet, exp_keys)
 
+    def test_filter_fresh_unparsed(self):
+        # Rows that are filtered out are not parsed, so the invalid number in
+        # rowB does not cause an error.
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,typed,,,simpledata,TypedRowModel,filter|expression;value2=='fruit'\n"
+        )
+        typed = csv_join(
+            "ID,value1,value2,number",
+            "rowA,orange,fruit,1",
+            "rowB,potato,root,not a number",
+            "rowC,apple,fruit,3",
+        )
+        sheet_reader = MockSheetReader(ci_sheet, {"typed": typed})
+        ci_parser = ContentIndexParser(sheet_reader, "tests.datarowmodels.simplemodel")
+        rows = ci_parser.get_data_sheet_rows("simpledata")
+        self.assertEqual(list(rows.keys()), ["rowA", "rowC"])
+        self.assertEqual(rows["rowC"].number, 3)
+
+    def test_filter_fresh_templated(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,simpleA,,,simpledata,SimpleRowModel,filter|expression;value2=='fruit'\n"
+        )
+        simple = csv_join(
+            "ID,value1,value2",
+            "rowA,orange,fruit",
+            "rowB,potato,{{'fr' ~ 'uit'}}",
+            "rowC,Manioc,root",
+        )
+        sheet_reader = MockSheetReader(ci_sheet, {"simpleA": simple})
+        ci_parser = ContentIndexParser(sheet_reader, "tests.datarowmodels.simplemodel")
+        rows = ci_parser.get_data_sheet_rows("simpledata")
+        self.assertEqual(list(rows.keys()), ["rowA", "rowB"])
+
+    def test_sort_by_keys(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,simpleA,,,simpledata,SimpleRowModel,\"sort|by;value2 descending, value1\"\n"
+        )
+        exp_keys = ["rowD", "rowB", "rowC", "rowA"]
+        self.check_filtersort(ci_sheet, exp_keys)
+
+    def test_sort_by_keys_default_order(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,simpleA,,,simpledata,SimpleRowModel,\"sort|by;value2, value1 ascending|order;descending\"\n"
+        )
+        exp_keys = ["rowD", "rowB", "rowC", "rowA"]
+        self.check_filtersort(ci_sheet, exp_keys)
+
+    def test_sort_by_typed_keys(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,typed,,,sorted_str,TypedRowModel,sort|by;value1\n"
+            "data_sheet,typed,,,sorted_numeric,TypedRowModel,sort|by;value1:numeric\n"
+            "data_sheet,typed,,,sorted_int,TypedRowModel,sort|by;number descending\n"
+        )
+        typed = csv_join(
+            "ID,value1,value2,number",
+            "rowA,10,,2",
+            "rowB,9,,10",
+            "rowC,100,,1",
+        )
+        sheet_reader = MockSheetReader(ci_sheet, {"typed": typed})
+        ci_parser = ContentIndexParser(sheet_reader, "tests.datarowmodels.simplemodel")
+        self.assertEqual(
+            list(ci_parser.get_data_sheet_rows("sorted_str").keys()),
+            ["rowA", "rowC", "rowB"],
+        )
+        self.assertEqual(
+            list(ci_parser.get_data_sheet_rows("sorted_numeric").keys()),
+            ["rowB", "rowA", "rowC"],
+        )
+        self.assertEqual(
+            list(ci_parser.get_data_sheet_rows("sorted_int").keys()),
+            ["rowB", "rowA", "rowC"],
+        )
+
+    def test_unused_data_sheet_not_parsed(self):
+        # The data sheet typeddata is never used, so its invalid number
+        # does not cause an error.
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,typed,,,typeddata,TypedRowModel,\n"
+            "data_sheet,simpleA,,,simpledata,SimpleRowModel,\n"
+        )
+        typed = csv_join(
+            "ID,value1,value2,number",
+            "rowA,orange,fruit,not a number",
+        )
+        simple = csv_join(
+            "ID,value1,value2",
+            "rowA,orange,fruit",
+        )
+        sheet_reader = MockSheetReader(ci_sheet, {"typed": typed, "simpleA": simple})
+        ci_parser = ContentIndexParser(sheet_reader, "tests.datarowmodels.simplemodel")
+        rows = ci_parser.get_data_sheet_rows("simpledata")
+        self.assertEqual(list(rows.keys()), ["rowA"])
+
+    def test_redefined_data_sheet(self):
+        # Data sheet definitions refer to the data sheets defined before them,
+        # even though they are only built later on.
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,simpleA,,,,SimpleRowModel,\n"
+            "data_sheet,simpleA,,,simpledata,SimpleRowModel,filter|expression;value2=='fruit'\n"
+            "data_sheet,simpleA,,,simpleA,SimpleRowModel,filter|expression;value2=='root'\n"
+        )
+        exp_keys = ["rowA", "rowC"]
+        self.check_filtersort(ci_sheet, exp_keys)
+
+    def test_index(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,simpleA,,,simpledata,SimpleRowModel,index|expression;value1.lower()\n"
+        )
+        exp_keys = ["orange", "potato", "apple", "manioc"]
+        rows = self.check_filtersort(ci_sheet, exp_keys)
+        self.assertEqual(rows["manioc"].ID, "rowD")
+
+    def test_group_by(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,simpleA,,,simpledata,SimpleRowModel,group_by|expression;value2\n"
+        )
+        rows = self.check_filtersort(ci_sheet, ["fruit", "root"])
+        self.assertEqual([row.ID for row in rows["fruit"]], ["rowA", "rowC"])
+        self.assertEqual([row.ID for row in rows["root"]], ["rowB", "rowD"])
+
+    def test_group_by_invalid_expression(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,simpleA,,,simpledata,SimpleRowModel,group_by|expression;nosuchname\n"
+        )
+        with patch("rpft.parsers.creation.contentindexparser.LOGGER") as logger:
+            # Rows whose key cannot be evaluated are dropped
+            self.check_filtersort(ci_sheet, [])
+        logger.critical.assert_called()
+
+    def test_group_by_as_sheet_argument(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,template_arguments,new_name,data_model,operation\n"  # noqa: E501
+            "template_definition,my_template,,,groups;sheet|,,,\n"
+            "data_sheet,simpleA,,,,grouped,SimpleRowModel,group_by|expression;value2\n"
+            "create_flow,my_template,,,grouped,,,\n"
+        )
+        my_template = (
+            "row_id,type,from,message_text\n"
+            ",send_message,start,{% for row in groups['fruit'] %}{{row.value1}} {% endfor %}\n"  # noqa: E501
+        )
+        simple = csv_join(
+            "ID,value1,value2",
+            "rowA,orange,fruit",
+            "rowB,potato,root",
+            "rowC,apple,fruit",
+        )
+        sheet_reader = MockSheetReader(
+            ci_sheet, {"simpleA": simple, "my_template": my_template}
+        )
+        with self.assertNoCriticalLogs():
+            ci_parser = ContentIndexParser(
+                sheet_reader, "tests.datarowmodels.simplemodel"
+            )
+            render_output = ci_parser.parse_all().render()
+        action = render_output["flows"][0]["nodes"][0]["actions"][0]
+        self.assertEqual(action["text"], "orange apple ")
+
+    def test_group_by_result_cannot_be_used_as_rows(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,simpleA,,,grouped,SimpleRowModel,group_by|expression;value2\n"
+            "data_sheet,grouped,,,filtered,SimpleRowModel,filter|expression;True\n"
+            "data_sheet,simpleA;grouped,,,joined,SimpleRowModel,join|expression;value2\n"
+            "create_flow,my_template,grouped,,,,\n"
+            "create_flow,my_template,grouped,fruit,,,\n"
+        )
+        my_template = "row_id,type,from,message_text\n,send_message,start,Hi\n"
+        simple = csv_join("ID,value1,value2", "rowA,orange,fruit")
+        sheet_reader = MockSheetReader(
+            ci_sheet, {"simpleA": simple, "my_template": my_template}
+        )
+        ci_parser = ContentIndexParser(sheet_reader, "tests.datarowmodels.simplemodel")
+        with keep_going_mode() as errors:
+            for name in ["filtered", "joined"]:
+                with self.assertRaises(ProcessingError):
+                    ci_parser.get_data_sheet_rows(name)
+            ci_parser.parse_all()
+        self.assertEqual(len(errors), 4)
+        for error, usage in zip(
+            errors,
+            [
+                "the input of another operation",
+                "joined",
+                "used to create a flow for each row",
+                "used with a data_row_id",
+            ],
+        ):
+            self.assertIn(
+                'Data sheet "grouped" is the result of a group_by operation, '
+                f"so it cannot be {usage}.",
+                error,
+            )
+
+    def test_join(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,categories,,,,TypedRowModel,\n"
+            "data_sheet,simpleA;categories,,,simpledata,SimpleRowModel,join|expression;value2\n"
+        )
+        simple = csv_join(
+            "ID,value1,value2",
+            "rowA,orange,fruit",
+            "rowB,potato,root",
+            "rowC,stone,mineral",
+        )
+        categories = csv_join(
+            "ID,value1,value2,number",
+            "fruit,Fruits,sweet,1",
+            "root,Roots,starchy,2",
+        )
+        sheet_reader = MockSheetReader(
+            ci_sheet, {"simpleA": simple, "categories": categories}
+        )
+        ci_parser = ContentIndexParser(sheet_reader, "tests.datarowmodels.simplemodel")
+        rows = ci_parser.get_data_sheet_rows("simpledata")
+        self.assertEqual(list(rows.keys()), ["rowA", "rowB"])
+        self.assertEqual(rows["rowA"].value1, "orange")
+        self.assertEqual(rows["rowA"].categories.value1, "Fruits")
+        self.assertEqual(rows["rowB"].categories.value2, "starchy")
+        # The joined sheet is parsed with its own model
+        self.assertEqual(rows["rowB"].categories.number, 2)
+        self.assertEqual(dict(rows["rowB"])["categories"].ID, "root")
+
+    def test_join_undefined_sheet(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operation\n"
+            "data_sheet,simpleA;categories,,,simpledata,SimpleRowModel,join|expression;value2\n"
+        )
+        simple = csv_join("ID,value1,value2", "rowA,orange,fruit")
+        categories = csv_join("ID,value1,value2", "fruit,Fruits,sweet")
+        sheet_reader = MockSheetReader(
+            ci_sheet, {"simpleA": simple, "categories": categories}
+        )
+        ci_parser = ContentIndexParser(sheet_reader, "tests.datarowmodels.simplemodel")
+        with keep_going_mode() as errors, self.assertRaises(ProcessingError):
+            ci_parser.get_data_sheet_rows("simpledata")
+        self.assertEqual(len(errors), 1)
+        self.assertIn('Cannot join data sheet "categories"', errors[0])
+
+    def test_pipeline(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operations.1,operations.2\n"
+            "data_sheet,simpleA,,,simpledata,SimpleRowModel,filter|expression;value2=='root',sort|expression;value1.lower()\n"
+        )
+        exp_keys = ["rowD", "rowB"]
+        with self.assertNoCriticalLogs():
+            self.check_filtersort(ci_sheet, exp_keys)
+
+    def test_pipeline_blank_operations(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operations.1,operations.2\n"
+            "data_sheet,simpleA,,,simpledata,SimpleRowModel,filter|expression;value2=='root',\n"
+        )
+        exp_keys = ["rowB", "rowD"]
+        with self.assertNoCriticalLogs():
+            self.check_filtersort(ci_sheet, exp_keys)
+
+    def test_pipeline_existing(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operations.1,operations.2,operations.3\n"
+            "data_sheet,simpleA,,,,SimpleRowModel,,,\n"
+            "data_sheet,simpleA,,,simpledata,SimpleRowModel,sort|expression;value1.lower()|order;descending,filter|expression;value2=='fruit',index|expression;value1\n"
+        )
+        exp_keys = ["orange", "apple"]
+        with self.assertNoCriticalLogs():
+            self.check_filtersort(ci_sheet, exp_keys, original="simpleA")
+
+    def test_pipeline_join(self):
+        ci_sheet = (
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model,operations.1,operations.2,operations.3\n"
+            "data_sheet,categories,,,,SimpleRowModel,,,\n"
+            "data_sheet,simpleA;categories,,,simpledata,SimpleRowModel,join|expression;value2,filter|expression;categories.value2=='sweet',group_by|expression;categories.value1\n"
+        )
+        simple = csv_join(
+            "ID,value1,value2",
+            "rowA,orange,fruit",
+            "rowB,potato,root",
+            "rowC,apple,fruit",
+        )
+        categories = csv_join(
+            "ID,value1,value2",
+            "fruit,Fruits,sweet",
+            "root,Roots,starchy",
+        )
+        sheet_reader = MockSheetReader(
+            ci_sheet, {"simpleA": simple, "categories": categories}
+        )
+        with self.assertNoCriticalLogs():
+            ci_parser = ContentIndexParser(
+                sheet_reader, "tests.datarowmodels.simplemodel"
+            )
+            rows = ci_parser.get_data_sheet_rows("simpledata")
+        self.assertEqual(list(rows.keys()), ["Fruits"])
+        self.assertEqual([row.ID for row in rows["Fruits"]], ["rowA", "rowC"])
+        self.assertEqual(
+            set(ci_parser.data_sheets.keys()), {"categories", "simpledata"}
+        )
+
 
 class TestParseCampaigns(unittest.TestCase):
     def test_parse_flow_campaign(self):
@@ -1062,6 +1485,15 @@ class TestParseFromFile(TestTemplate):
         ci_parser = ContentIndexParser(reader, "tests.input.example1.nestedmodel")
         self.check_example1(ci_parser)
 
+    def test_example1_csv_compact(self):
+        sheet_reader = CSVSheetReader(self.input_dir / "csv_workbook")
+        ci_parser = ContentIndexParser(
+            sheet_reader,
+            "tests.input.example1.nestedmodel",
+            compact_data_sheets=True,
+        )
+        self.check_example1(ci_parser)
+
 
 class TestMultiFile(TestTemplate):
     def check(self, ci_parser, flow_name, messages_exp):
@@ -1,10 +1,15 @@
 import json
+import tempfile
+from pathlib import Path
 from unittest import TestCase
 
 from tablib import Dataset
 
-from rpft.converters import to_json
+from rpft.converters import create_flows, to_json
+from rpft.logger.logger import CriticalErrors
 from rpft.parsers.sheets import AbstractSheetReader, Sheet
+from rpft.rapidpro.utils import deterministic_uuids, generate_new_uuid, uuid_scope
+from tests import TESTS_ROOT
 
 
 class TestReaderToJson(TestCase):
@@ -55,6 +60,146 @@ class TestReaderToJson(TestCase):
         )
 
 
+class TestDeterministicUUIDs(TestCase):
+    def create_flows(self, uuid_seed):
+        return create_flows(
+            [TESTS_ROOT / "input/example1/csv_workbook"],
+            None,
+            "csv",
+            data_models="tests.input.example1.nestedmodel",
+            uuid_seed=uuid_seed,
+        )
+
+    def test_create_flows(self):
+        self.assertEqual(self.create_flows("seed"), self.create_flows("seed"))
+        self.assertNotEqual(self.create_flows("seed"), self.create_flows("other"))
+        self.assertNotEqual(self.create_flows(None), self.create_flows(None))
+
+    def test_scopes(self):
+        with deterministic_uuids(1):
+            with uuid_scope("a"):
+                uuids_a = [generate_new_uuid(), generate_new_uuid()]
+            with uuid_scope("b"):
+                uuid_b = generate_new_uuid()
+            with uuid_scope("a"):
+                self.assertEqual(generate_new_uuid(), uuids_a[0])
+        self.assertNotEqual(uuids_a[0], uuids_a[1])
+        self.assertNotIn(uuid_b, uuids_a)
+
+
+class TestKeepGoing(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.input = Path(self.directory.name) / "input"
+        self.input.mkdir()
+        self.write_sheet(
+            "content_index",
+            "type,sheet_name\n"
+            "create_flow,good1\n"
+            "create_flow,bad1\n"
+            "create_flow,good2\n"
+            "create_flow,bad2\n",
+        )
+        self.write_sheet(
+            "good1",
+            "row_id,type,from,message_text\n,send_message,start,Hello\n",
+        )
+        self.write_sheet(
+            "good2",
+            "row_id,type,from,message_text\n,send_message,start,Bye\n",
+        )
+        self.write_sheet(
+            "bad1",
+            "row_id,type,from,message_text\n,send_message,start,{{ 1/0 }}\n",
+        )
+        self.write_sheet(
+            "bad2",
+            "row_id,type,from,message_text\n"
+            ",send_message,start,Hi\n"
+            ",begin_for,,1;2\n",
+        )
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_sheet(self, name, content):
+        (self.input / f"{name}.csv").write_text(content)
+
+    def test_broken_flows_are_skipped_and_errors_reported(self):
+        output = Path(self.directory.name) / "flows.json"
+
+        with self.assertRaises(CriticalErrors) as context:
+            create_flows([self.input], output, "csv", keep_going=True)
+
+        flows = json.loads(output.read_text())
+        self.assertEqual(flows, context.exception.result)
+        self.assertEqual([flow["name"] for flow in flows["flows"]], ["good1", "good2"])
+        errors = context.exception.errors
+        self.assertEqual(len(errors), 2)
+        self.assertIn("input-content_index | row 3 | bad1 | row 2: ", errors[0])
+        self.assertIn("division by zero", errors[0])
+        self.assertIn("input-content_index | row 5 | bad2 | row 3: ", errors[1])
+        self.assertIn("begin_for must have a loop_variable", errors[1])
+
+    def test_broken_data_sheet_is_reported_once(self):
+        self.write_sheet(
+            "content_index",
+            "type,sheet_name,data_sheet,new_name,data_model,"
+            "operation.type,operation.expression\n"
+            "create_flow,template,filtered,,,,\n"
+            "data_sheet,simpledata,,filtered,SimpleRowModel,filter,nosuchname==1\n"
+            "create_flow,template,filtered,,,,\n"
+            "create_flow,good1,,,,,\n",
+        )
+        self.write_sheet("simpledata", "ID,value1,value2\nrow1,a,b\n")
+        self.write_sheet(
+            "template",
+            "row_id,type,from,message_text\n,send_message,start,{{value1}}\n",
+        )
+        with self.assertRaises(CriticalErrors) as context:
+            create_flows(
+                [self.input],
+                None,
+                "csv",
+                data_models="tests.datarowmodels.simplemodel",
+                keep_going=True,
+            )
+
+        flows = context.exception.result["flows"]
+        self.assertEqual([flow["name"] for flow in flows], ["good1"])
+        errors = context.exception.errors
+        self.assertEqual(len(errors), 1)
+        self.assertIn(
+            "input-content_index | row 3: Invalid filtering expression", errors[0]
+        )
+
+    def test_invalid_data_sheet_definition_is_reported_once(self):
+        self.write_sheet(
+            "content_index",
+            "type,sheet_name,data_sheet,data_row_id,new_name,data_model\n"
+            "data_sheet,simpledata,,,,SimpleRowModel\n"
+            "create_flow,template,simpledata,row1,,\n"
+            "create_flow,good1,,,,\n",
+        )
+        self.write_sheet("simpledata", "ID,value1,value2\nrow1,a,b\n")
+        self.write_sheet(
+            "template",
+            "row_id,type,from,message_text\n,send_message,start,{{value1}}\n",
+        )
+
+        # No data models are provided
+        with self.assertRaises(CriticalErrors) as context:
+            create_flows([self.input], None, "csv", keep_going=True)
+
+        flows = context.exception.result["flows"]
+        self.assertEqual([flow["name"] for flow in flows], ["good1"])
+        errors = context.exception.errors
+        self.assertEqual(len(errors), 1)
+        self.assertIn(
+            "input-content_index | row 2: If there are data sheets", errors[0]
+        )
+
+
 class MockSheetReader(AbstractSheetReader):
     def __init__(self, sheets):
         self._sheets = sheets
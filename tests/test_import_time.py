@@ -0,0 +1,35 @@
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# Importing these eagerly made the CLI several times slower to start, so they
+# must only be imported when a command needs them.
+HEAVY_MODULES = ["googleapiclient", "google", "networkx"]
+
+
+def run_python(*args):
+    # The CLI module creates a log file in the working directory on import
+    with tempfile.TemporaryDirectory() as directory:
+        return subprocess.run(
+            [sys.executable, *args],
+            capture_output=True,
+            check=True,
+            cwd=directory,
+            text=True,
+        )
+
+
+class TestImportTime(unittest.TestCase):
+    def test_heavy_dependencies_are_not_imported(self):
+        result = run_python(
+            "-c",
+            # Namespace packages such as google may be set up on startup
+            "import sys\n"
+            "before = set(sys.modules)\n"
+            "import rpft.cli\n"
+            "for module in set(sys.modules) - before:\n"
+            f"    if module.split('.')[0] in {HEAVY_MODULES}:\n"
+            "        print(module)",
+        )
+        self.assertEqual(result.stdout.split(), [])
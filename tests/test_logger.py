@@ -0,0 +1,110 @@
+import json
+import logging
+import tempfile
+import unittest
+from pathlib import Path
+
+from rpft.logger.logger import (
+    ContextFilter,
+    ProcessingError,
+    TraceRecorder,
+    error_boundary,
+    get_logger,
+    keep_going_mode,
+    logging_context,
+    logging_context_handler,
+)
+
+
+class CountingValue:
+    def __init__(self):
+        self.formatted = 0
+
+    def __format__(self, format_spec):
+        self.formatted += 1
+        return "value"
+
+
+class TestLoggingContext(unittest.TestCase):
+    def test_lazy_formatting(self):
+        value = CountingValue()
+        with logging_context("sheet"):
+            with logging_context("row {}", value, variable=1):
+                self.assertEqual(value.formatted, 0)
+                record = logging.LogRecord("main", logging.ERROR, "", 0, "", (), None)
+                ContextFilter().filter(record)
+                self.assertEqual(record.processing_stack, "sheet | row value")
+                self.assertEqual(record.context_variables, {"variable": 1})
+                self.assertEqual(value.formatted, 1)
+
+    def test_skip_context_variables(self):
+        record = logging.LogRecord("main", logging.ERROR, "", 0, "", (), None)
+        with logging_context("sheet", variable=1):
+            ContextFilter(include_context_variables=False).filter(record)
+        self.assertEqual(record.processing_stack, "sheet")
+        self.assertFalse(hasattr(record, "context_variables"))
+
+
+class TestTraceRecorder(unittest.TestCase):
+    def setUp(self):
+        logging_context_handler.trace_recorder = TraceRecorder()
+
+    def tearDown(self):
+        logging_context_handler.trace_recorder = None
+
+    def test_nested_contexts(self):
+        with logging_context("sheet"):
+            with logging_context("row 2"):
+                pass
+        events = logging_context_handler.trace_recorder.events
+        self.assertEqual(
+            [(event["name"], event["ph"]) for event in events],
+            [("sheet", "B"), ("row 2", "B"), ("row 2", "E"), ("sheet", "E")],
+        )
+        timestamps = [event["ts"] for event in events]
+        self.assertEqual(timestamps, sorted(timestamps))
+
+    def test_write(self):
+        with logging_context("sheet"):
+            pass
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "trace.json"
+            logging_context_handler.trace_recorder.write(path)
+            with open(path) as trace_file:
+                trace = json.load(trace_file)
+        self.assertEqual(len(trace["traceEvents"]), 2)
+
+
+class TestKeepGoing(unittest.TestCase):
+    def setUp(self):
+        self.logger = get_logger()
+
+    def test_errors_are_recorded_and_units_skipped(self):
+        processed = []
+        with keep_going_mode() as errors:
+            for unit in ["good", "bad", "worse", "fine"]:
+                with error_boundary(), logging_context(unit):
+                    if unit in ("bad", "worse"):
+                        self.logger.critical(f"{unit} unit")
+                    processed.append(unit)
+        self.assertEqual(processed, ["good", "fine"])
+        self.assertEqual(
+            errors, ["CRITICAL: bad: bad unit", "CRITICAL: worse: worse unit"]
+        )
+
+    def test_errors_outside_boundaries_raise(self):
+        with keep_going_mode() as errors, self.assertRaises(ProcessingError):
+            self.logger.critical("fatal")
+        self.assertEqual(errors, ["CRITICAL: : fatal"])
+
+    def test_errors_are_not_collected_after_exit(self):
+        with keep_going_mode() as errors:
+            pass
+        with self.assertLogs(self.logger, logging.CRITICAL):
+            self.logger.critical("not collected")
+        self.assertEqual(errors, [])
+
+    def test_other_exceptions_propagate(self):
+        with self.assertRaises(ValueError):
+            with error_boundary():
+                raise ValueError
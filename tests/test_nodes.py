@@ -1,7 +1,9 @@
+import copy
 import unittest
+from unittest.mock import patch
 
 from rpft.rapidpro.models.actions import SendMessageAction
-from rpft.rapidpro.models.nodes import BasicNode, CallWebhookNode
+from rpft.rapidpro.models.nodes import BasicNode, CallWebhookNode, SwitchRouterNode
 
 
 class TestNodes(unittest.TestCase):
@@ -68,3 +70,62 @@ class TestNodes(unittest.TestCase):
         self.assertEqual(router["operand"], "@results.webhook_result.category")
         self.assertEqual(len(router["cases"]), 1)
         self.assertEqual(len(router["categories"]), 2)
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        self.node = BasicNode()
+        self.action = SendMessageAction(text="Hello", quick_replies=["yes"])
+        self.node.add_action(self.action)
+
+    def render_actions(self, node):
+        return node.render_cached()[0]["actions"]
+
+    def test_unchanged_node_is_not_rendered_again(self):
+        with patch.object(
+            BasicNode, "render", autospec=True, side_effect=BasicNode.render
+        ) as render:
+            first_render = self.node.render_cached()
+            second_render = self.node.render_cached()
+        render.assert_called_once()
+        self.assertEqual(first_render, second_render)
+
+    def test_output_can_be_modified(self):
+        self.render_actions(self.node)[0]["text"] = "Modified"
+        self.render_actions(self.node)[0]["quick_replies"].append("Modified")
+        self.assertEqual(self.render_actions(self.node)[0]["text"], "Hello")
+        self.assertEqual(self.render_actions(self.node)[0]["quick_replies"], ["yes"])
+
+    def test_modified_parts_invalidate_cache(self):
+        self.render_actions(self.node)
+        self.action.text = "Bye"
+        self.assertEqual(self.render_actions(self.node)[0]["text"], "Bye")
+        self.action.add_quick_reply("no")
+        self.assertEqual(
+            self.render_actions(self.node)[0]["quick_replies"], ["yes", "no"]
+        )
+        self.node.add_action(SendMessageAction(text="Second"))
+        self.assertEqual(len(self.render_actions(self.node)), 2)
+        self.node.update_default_exit("destination")
+        self.assertEqual(
+            self.node.render_cached()[0]["exits"][0]["destination_uuid"],
+            "destination",
+        )
+
+    def test_modified_router_invalidates_cache(self):
+        node = SwitchRouterNode("@input.text")
+        node.add_choice("@input.text", "has_any_word", ["a"], "A", "destination_a")
+        node.render_cached()
+        node.add_choice("@input.text", "has_any_word", ["b"], "B", "destination_b")
+        cases = node.render_cached()[0]["router"]["cases"]
+        self.assertEqual([case["arguments"] for case in cases], [["a"], ["b"]])
+        node.router.cases[0].arguments = ["c"]
+        cases = node.render_cached()[0]["router"]["cases"]
+        self.assertEqual(cases[0]["arguments"], ["c"])
+
+    def test_copies_are_cached_separately(self):
+        self.node.render_cached()
+        clone = copy.deepcopy(self.node)
+        clone.actions[0].text = "Bye"
+        self.assertEqual(self.render_actions(self.node)[0]["text"], "Hello")
+        self.assertEqual(self.render_actions(clone)[0]["text"], "Bye")
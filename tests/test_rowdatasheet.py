@@ -2,8 +2,11 @@ import unittest
 from collections import OrderedDict
 from pathlib import Path
 from tempfile import TemporaryDirectory
+from typing import List
 
+from rpft.parsers.common.cellparser import CellParser
 from rpft.parsers.common.rowdatasheet import RowDataSheet
+from rpft.parsers.common.rowparser import ParserModel, RowParser
 from tests.mocks import MockRowParser
 
 
@@ -119,5 +122,59 @@ class TestRowDataSheet(unittest.TestCase):
             )
 
 
+class SubModel(ParserModel):
+    int_field: int = 0
+    str_field: str = ""
+
+
+class OrderedModel(ParserModel):
+    str_field: str = ""
+    model_list: List[SubModel] = []
+    renamed_a: str = ""
+    renamed_b: List[str] = []
+    last_field: str = ""
+
+    def field_name_to_header_name(field):
+        field_map = {
+            "renamed_a": "renamed",
+            "renamed_b": "renamed",
+        }
+        return field_map.get(field, field)
+
+
+class TestRowDataSheetModelHeaders(unittest.TestCase):
+    def setUp(self):
+        self.rowparser = RowParser(OrderedModel, CellParser())
+
+    def test_get_headers_from_model(self):
+        rows = [
+            OrderedModel(last_field="x", str_field="y"),
+            OrderedModel(
+                renamed_b=["a", "b"],
+                model_list=[SubModel(str_field=str(i)) for i in range(1, 11)],
+            ),
+            OrderedModel(renamed_a="c", model_list=[SubModel(int_field=1)]),
+        ]
+        sheet = RowDataSheet(self.rowparser, rows, target_headers={"renamed"})
+        headers = sheet._get_headers()
+        self.assertEqual(
+            headers,
+            ["str_field", "model_list.1.int_field"]
+            + [f"model_list.{i}.str_field" for i in range(1, 11)]
+            + ["renamed", "last_field"],
+        )
+
+    def test_get_headers_independent_of_row_order(self):
+        rows = [
+            OrderedModel(last_field="x"),
+            OrderedModel(str_field="y"),
+            OrderedModel(renamed_a="z"),
+        ]
+        headers = RowDataSheet(self.rowparser, rows)._get_headers()
+        reversed_headers = RowDataSheet(self.rowparser, rows[::-1])._get_headers()
+        self.assertEqual(headers, ["str_field", "renamed", "last_field"])
+        self.assertEqual(headers, reversed_headers)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,7 +1,8 @@
 import unittest
 import tablib
 
-from rpft.parsers.common.rowparser import ParserModel
+from rpft.parsers.common.cellparser import CellParser
+from rpft.parsers.common.rowparser import ParserModel, RowParser
 from rpft.parsers.common.sheetparser import SheetParser
 from tests.mocks import MockRowParser
 
@@ -17,6 +18,11 @@ row2f1,row2f2
 row3f1,row3f2
 """
 
+input_loop = """field1,field2
+static,{{outer}}
+{{item}},{{outer}}
+"""
+
 
 class TestSheetParser(unittest.TestCase):
     def setUp(self):
@@ -40,6 +46,35 @@ class TestSheetParser(unittest.TestCase):
         row2b = parser.parse_next_row()
         self.assertEqual(row2b, {"field1": "row2f1", "field2": "row2f2", "context": {}})
 
+    def test_context_not_copied(self):
+        sheet = {"row1": {"field1": "a"}}
+        context = {"key": "value", "sheet": sheet}
+        parser = SheetParser(self.rowparser, self.table1, context)
+        parser.add_to_context("key", "loop value")
+        row1 = parser.parse_next_row()
+        self.assertEqual(row1["context"], {"key": "loop value", "sheet": sheet})
+        self.assertIs(row1["context"]["sheet"], sheet)
+        parser.remove_from_context("key")
+        row2 = parser.parse_next_row()
+        self.assertEqual(row2["context"], {"key": "value", "sheet": sheet})
+        # The original context is left unchanged
+        self.assertEqual(context, {"key": "value", "sheet": sheet})
+
+    def test_loop_rows_memoized(self):
+        table = tablib.import_set(input_loop, format="csv")
+        parser = SheetParser(RowParser(MainModel, CellParser()), table, {"outer": "o"})
+        parser.create_bookmark("loop")
+        rows = []
+        for item in ["a", "b"]:
+            parser.go_to_bookmark("loop")
+            parser.add_to_context("item", item)
+            rows.append([parser.parse_next_row(), parser.parse_next_row()])
+        self.assertEqual(rows[0][0], MainModel(field1="static", field2="o"))
+        # Rows that don't depend on the loop variable are only parsed once
+        self.assertIs(rows[0][0], rows[1][0])
+        self.assertEqual(rows[0][1], MainModel(field1="a", field2="o"))
+        self.assertEqual(rows[1][1], MainModel(field1="b", field2="o"))
+
     def test_parse_all(self):
         parser = SheetParser(self.rowparser, self.table1)
         rows = parser.parse_all()
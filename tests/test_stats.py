@@ -0,0 +1,33 @@
+import unittest
+
+from rpft.stats import Stats
+
+
+class TestStats(unittest.TestCase):
+    def test_disabled(self):
+        stats = Stats()
+        with stats.timer("stage"):
+            stats.count("counter")
+        self.assertEqual(stats.to_dict(), {"timers": {}, "counters": {}})
+
+    def test_timers_and_counters(self):
+        stats = Stats()
+        stats.enabled = True
+        for _ in range(2):
+            with stats.timer("outer"):
+                with stats.timer("inner"):
+                    # Recursive calls are counted but not timed separately
+                    with stats.timer("inner"):
+                        stats.count("counter", 2)
+        stats.count("other")
+        result = stats.to_dict()
+        self.assertEqual(result["counters"], {"counter": 4, "other": 1})
+        self.assertEqual(result["timers"]["outer"]["calls"], 2)
+        self.assertEqual(result["timers"]["inner"]["calls"], 4)
+        self.assertLessEqual(
+            result["timers"]["inner"]["wall_time"],
+            result["timers"]["outer"]["wall_time"],
+        )
+        table = stats.format_table()
+        self.assertIn("outer", table)
+        self.assertIn("other", table)
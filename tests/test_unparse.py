@@ -3,7 +3,14 @@ from collections import OrderedDict
 from typing import List, Optional
 
 from rpft.parsers.common.cellparser import CellParser
-from rpft.parsers.common.rowparser import ParserModel, RowParser, RowParserError
+from rpft.parsers.common.rowparser import (
+    HeaderMatcher,
+    ParserModel,
+    RowParser,
+    RowParserError,
+    get_default_values,
+    is_default_value,
+)
 from tests.mocks import MockCellParser
 
 
@@ -388,6 +395,53 @@ class TestUnparseToStringDict(unittest.TestCase):
         }
         self.assertEqual(output1, exp1)
 
+    def test_recurse_with_headers(self):
+        self.parser.output_dict = {}
+        self.parser.unparse_row_recurse(
+            self.metalistinstance,
+            "",
+            {"basic_model_list.*"},
+            {"model_with_stuff"},
+        )
+        exp = {
+            "basic_model_list.1": "int_field;42|str_field;word",
+            "basic_model_list.2": "int_field;14|str_field;draw",
+        }
+        self.assertEqual(self.parser.output_dict, exp)
+
+
+class TestHeaderMatcher(unittest.TestCase):
+    def test_matches(self):
+        matcher = HeaderMatcher({"a.b.field", "list.*", "x.*.field"})
+        self.assertTrue(matcher.matches(".a.b.field"))
+        self.assertTrue(matcher.matches("a.b.field"))
+        self.assertTrue(matcher.matches(".list.1"))
+        self.assertTrue(matcher.matches(".x.2.field"))
+        self.assertFalse(matcher.matches(".a.b"))
+        self.assertFalse(matcher.matches(".list"))
+        self.assertFalse(matcher.matches(".x.2.other"))
+        self.assertFalse(matcher.matches(""))
+
+    def test_empty(self):
+        matcher = HeaderMatcher(set())
+        self.assertFalse(matcher.matches(".a"))
+
+
+class TestDefaultValues(unittest.TestCase):
+    def test_default_values(self):
+        defaults = get_default_values(MainModel)
+        self.assertEqual(defaults["model_default"], ModelWithStuff())
+        self.assertEqual(defaults["model_list"], [])
+        self.assertIsNone(defaults["model_optional"])
+        self.assertIs(defaults, get_default_values(MainModel))
+
+    def test_is_default_value(self):
+        instance = MainModel(model_default={"int_field": 1})
+        self.assertTrue(is_default_value(instance, "model_list", []))
+        self.assertFalse(
+            is_default_value(instance, "model_default", instance.model_default)
+        )
+
 
 if __name__ == "__main__":
     unittest.main()